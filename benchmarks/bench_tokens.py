@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Microbenchmarks for token creation, validation and loading.
+
+Benchmarks run offline against the test application and print results as
+JSON, so that results of two releases can be compared:
+
+.. code-block:: console
+
+    $ python benchmarks/bench_tokens.py --output before.json
+    $ python benchmarks/bench_tokens.py --compare before.json
+
+With ``--compare``, the script exits with a non-zero status if the median
+latency of any benchmark increased by more than ``--threshold``.
+"""
+
+from __future__ import absolute_import, print_function
+
+import argparse
+import json
+import os
+import platform
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+import itsdangerous
+
+from zenodo_accessrequests import __version__
+from zenodo_accessrequests.tokens import CompactSecretLinkSerializer, \
+    EmailConfirmationSerializer, EncryptedTokenMixIn, SecretLinkFactory, \
+    SecretLinkSerializer, TimedSecretLinkSerializer
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tests'))
+
+from helpers import create_app  # noqa isort:skip
+
+ALGORITHMS = ('HS256', 'HS512')
+EXTRA_DATA = dict(recid=56789)
+
+
+class EncryptedSecretLinkSerializer(EncryptedTokenMixIn,
+                                    SecretLinkSerializer):
+    """Serializer for encrypted secret links."""
+
+
+def _percentile(values, percent):
+    """Get percentile of sorted values (nearest rank)."""
+    index = max(int(round(percent / 100.0 * len(values))) - 1, 0)
+    return values[index]
+
+
+def measure(func, number, repeat):
+    """Measure latency of a function.
+
+    :param number: Number of calls per sample.
+    :param repeat: Number of samples.
+    :returns: Dictionary of throughput (calls per second) and latency
+        statistics (microseconds per call).
+    """
+    timer = timeit.Timer(func)
+    samples = sorted(
+        t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number))
+    return dict(
+        ops=1e6 / samples[len(samples) // 2],
+        min=samples[0],
+        median=samples[len(samples) // 2],
+        p95=_percentile(samples, 95),
+        max=samples[-1],
+        mean=sum(samples) / len(samples),
+    )
+
+
+def _tamper(token):
+    """Modify the signature of a token."""
+    return token[:-2] + (b'B' if token[-2:-1] == b'A' else b'A') + token[-1:]
+
+
+def token_benchmarks():
+    """Generate benchmark names and functions.
+
+    Must be called inside an application context.
+    """
+    future = datetime.utcnow() + timedelta(days=1)
+    past = datetime.utcnow() - timedelta(days=1)
+
+    serializers = []
+    for algorithm in ALGORITHMS:
+        serializers.append(('{0}/untimed'.format(algorithm),
+                            SecretLinkSerializer(algorithm_name=algorithm),
+                            None))
+        serializers.append(('{0}/timed'.format(algorithm),
+                            TimedSecretLinkSerializer(
+                                expires_at=future, algorithm_name=algorithm),
+                            TimedSecretLinkSerializer(
+                                expires_at=past, algorithm_name=algorithm)))
+    serializers.append(('compact/untimed', CompactSecretLinkSerializer(),
+                        None))
+    serializers.append(('compact/timed',
+                        CompactSecretLinkSerializer(expires_at=future),
+                        CompactSecretLinkSerializer(expires_at=past)))
+
+    for variant, s, expired_s in serializers:
+        yield ('secretlink/create/{0}'.format(variant),
+               lambda s=s: s.create_token(1234, EXTRA_DATA))
+
+        tokens = [('valid', s.create_token(1234, EXTRA_DATA))]
+        tokens.append(('tampered', _tamper(tokens[0][1])))
+        if expired_s is not None:
+            tokens.append(
+                ('expired', expired_s.create_token(1234, EXTRA_DATA)))
+
+        for kind, t in tokens:
+            yield ('secretlink/validate/{0}/{1}'.format(variant, kind),
+                   lambda t=t: SecretLinkFactory.validate_token(
+                       t, expected_data=EXTRA_DATA))
+            yield ('secretlink/load/{0}/{1}'.format(variant, kind),
+                   lambda t=t: SecretLinkFactory.load_token(t, force=True))
+
+    for t in (b'garbage', b'gar.ba.ge'):
+        yield ('secretlink/validate/garbage/{0}'.format(
+            'jws' if b'.' in t else 'compact'),
+            lambda t=t: SecretLinkFactory.validate_token(t))
+
+    yield ('secretlink/factory/create/untimed',
+           lambda: SecretLinkFactory.create_token(1234, EXTRA_DATA))
+    yield ('secretlink/factory/create/timed',
+           lambda: SecretLinkFactory.create_token(
+               1234, EXTRA_DATA, expires_at=future))
+
+    s = EncryptedSecretLinkSerializer()
+    t = s.create_token(1234, EXTRA_DATA)
+    yield ('encrypted/create', lambda: s.create_token(1234, EXTRA_DATA))
+    yield ('encrypted/validate/valid', lambda: s.validate_token(t))
+
+    email_data = dict(email='info@zenodo.org')
+    for algorithm in ALGORITHMS:
+        t = EmailConfirmationSerializer(
+            algorithm_name=algorithm).create_token(1234, email_data)
+        yield ('emailconfirmation/compat_validate/{0}/valid'.format(
+            algorithm),
+            lambda t=t: EmailConfirmationSerializer.compat_validate_token(
+                t, expected_data=email_data))
+    yield ('emailconfirmation/compat_validate/garbage',
+           lambda: EmailConfirmationSerializer.compat_validate_token(
+               b'gar.ba.ge'))
+
+
+def run(number, repeat, pattern=None):
+    """Run the benchmarks.
+
+    :param pattern: Only run benchmarks whose name contains the pattern.
+    :returns: Dictionary of environment information and results.
+    """
+    app = create_app()
+    results = {}
+    with app.app_context():
+        for name, func in token_benchmarks():
+            if pattern and pattern not in name:
+                continue
+            func()  # warm up
+            results[name] = measure(func, number, repeat)
+    return dict(
+        environment=dict(
+            python=platform.python_version(),
+            implementation=platform.python_implementation(),
+            machine=platform.machine(),
+            itsdangerous=itsdangerous.__version__,
+            zenodo_accessrequests=__version__,
+        ),
+        parameters=dict(number=number, repeat=repeat),
+        created=datetime.utcnow().isoformat(),
+        unit='us',
+        results=results,
+    )
+
+
+def compare(results, baseline, threshold):
+    """Compare median latencies against a baseline.
+
+    :returns: List of names of benchmarks which regressed.
+    """
+    regressions = []
+    for name, stats in sorted(results['results'].items()):
+        base = baseline['results'].get(name)
+        if base is None:
+            continue
+        change = stats['median'] / base['median'] - 1
+        stats['change'] = change
+        if change > threshold:
+            regressions.append(name)
+            print('{0}: {1:.1f}us -> {2:.1f}us ({3:+.0%})'.format(
+                name, base['median'], stats['median'], change),
+                file=sys.stderr)
+    return regressions
+
+
+def main(argv=None):
+    """Run benchmarks from the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--number', type=int, default=200,
+                        help='number of calls per sample')
+    parser.add_argument('-r', '--repeat', type=int, default=20,
+                        help='number of samples per benchmark')
+    parser.add_argument('-k', '--pattern',
+                        help='only run benchmarks containing the pattern')
+    parser.add_argument('-o', '--output', type=argparse.FileType('w'),
+                        default=sys.stdout, help='file for JSON results')
+    parser.add_argument('--compare', type=argparse.FileType('r'),
+                        help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='relative increase of the median latency '
+                             'reported as regression')
+    args = parser.parse_args(argv)
+
+    results = run(args.number, args.repeat, pattern=args.pattern)
+    regressions = []
+    if args.compare:
+        regressions = compare(results, json.load(args.compare),
+                              args.threshold)
+    json.dump(results, args.output, indent=2, sort_keys=True)
+    args.output.write('\n')
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -90,6 +90,7 @@ app.config.update(
             route='/records/<pid_value>/accessrequest',
             template='zenodo_accessrequests/access_request.html',
             view_imp='zenodo_accessrequests.views.requests.access_request',
+            record_class='zenodo_accessrequests.utils:RecordFields',
             methods=['GET', 'POST'],
         ),
         recid_access_request_email_confirm=dict(
@@ -97,6 +98,7 @@ app.config.update(
             route='/records/<pid_value>/accessrequest/<token>/confirm',
             #  template='invenio_records_ui/detail.html',
             view_imp='zenodo_accessrequests.views.requests.confirm',
+            record_class='zenodo_accessrequests.utils:RecordFields',
         ),
     )
 )
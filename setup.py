@@ -42,6 +42,7 @@ tests_require = [
     'pytest-cov>=2.5.1',
     'pytest-pep8>=1.0.6',
     'pytest>=3.7.0',
+    'simplekv>=0.10.0',
 ]
 
 extras_require = {
@@ -75,6 +76,7 @@ install_requires = [
     'invenio-pidstore>=1.0.0b1',
     'invenio-records>=1.0.0b1',
     'itsdangerous>=1.1.0',
+    'six>=1.12.0',
     'WTForms>=2.0',
 ]
 
@@ -108,6 +110,21 @@ setup(
             'secretlinks_adminview = '
             'zenodo_accessrequests.admin:secretlinks_adminview',
         ],
+        'flask.commands': [
+            'accessrequests = zenodo_accessrequests.cli:accessrequests',
+        ],
+        'invenio_access.actions': [
+            'accessrequests_introspect_tokens = '
+            'zenodo_accessrequests.permissions:introspect_tokens_action',
+        ],
+        'invenio_base.api_apps': [
+            'zenodo_accessrequests = '
+            'zenodo_accessrequests:ZenodoAccessRequestsREST',
+        ],
+        'invenio_base.api_blueprints': [
+            'zenodo_accessrequests_api = '
+            'zenodo_accessrequests.views.api:blueprint',
+        ],
         'invenio_base.apps': [
             'zenodo_accessrequests = '
             'zenodo_accessrequests:ZenodoAccessRequests',
@@ -118,6 +135,12 @@ setup(
             'zenodo_accessrequests_settings = '
             'zenodo_accessrequests.views.settings:blueprint',
         ],
+        'invenio_db.alembic': [
+            'zenodo_accessrequests = zenodo_accessrequests:alembic',
+        ],
+        'invenio_celery.tasks': [
+            'zenodo_accessrequests = zenodo_accessrequests.tasks',
+        ],
         'invenio_db.models': [
             'zenodo_accessrequests = zenodo_accessrequests.models',
         ],
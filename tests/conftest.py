@@ -27,96 +27,24 @@
 
 from __future__ import absolute_import, print_function
 
-import os
 import uuid
 from datetime import datetime
 
 import pytest
-from flask import Flask
-from flask_babelex import Babel
-from flask_menu import Menu as FlaskMenu
-from helpers import create_access_request
-from invenio_access import InvenioAccess
-from invenio_accounts import InvenioAccounts
+from helpers import create_access_request, create_app
 from invenio_accounts.testutils import create_test_user
-from invenio_accounts.views import blueprint as blueprint_user
-from invenio_db import InvenioDB
 from invenio_db import db as db_
-from invenio_formatter import InvenioFormatter
-from invenio_mail import InvenioMail as Mail
-from invenio_pidstore import InvenioPIDStore
 from invenio_pidstore.models import PersistentIdentifier, PIDStatus
-from invenio_records import InvenioRecords
 from invenio_records.api import Record
-from invenio_records_ui import InvenioRecordsUI
-from invenio_records_ui.views import create_blueprint_from_app
 from simplekv.memory.redisstore import RedisStore
 from sqlalchemy_utils.functions import create_database, database_exists, \
     drop_database
 
-from zenodo_accessrequests import ZenodoAccessRequests
-from zenodo_accessrequests.views.requests import blueprint as request_blueprint
-from zenodo_accessrequests.views.settings import \
-    blueprint as settings_blueprint
-
 
 @pytest.yield_fixture
 def app(request):
     """Flask application fixture."""
-    app_ = Flask('testapp')
-    app_.config.update(
-        TESTING=True,
-        CELERY_ALWAYS_EAGER=True,
-        CELERY_CACHE_BACKEND="memory",
-        CELERY_EAGER_PROPAGATES_EXCEPTIONS=True,
-        CELERY_RESULT_BACKEND="cache",
-        SQLALCHEMY_DATABASE_URI=os.environ.get(
-            'SQLALCHEMY_DATABASE_URI', 'sqlite://'
-        ),
-        SQLALCHEMY_TRACK_MODIFICATIONS=False,
-        SECRET_KEY='mysecret',
-        SUPPORT_EMAIL='info@zenodo.org',
-        WTF_CSRF_ENABLED=False,
-        SERVER_NAME='test.it',
-        RECORDS_UI_ENDPOINTS=dict(
-            recid=dict(
-                pid_type='recid',
-                route='/records/<pid_value>',
-                template='invenio_records_ui/detail.html',
-            ),
-            recid_access_request=dict(
-                pid_type='recid',
-                route='/records/<pid_value>/accessrequest',
-                template='zenodo_accessrequests/access_request.html',
-                view_imp='zenodo_accessrequests.views.requests.access_request',
-                methods=['GET', 'POST'],
-            ),
-            recid_access_request_email_confirm=dict(
-                pid_type='recid',
-                route='/records/<pid_value>/accessrequest/<token>/confirm',
-                #  template='invenio_records_ui/detail.html',
-                view_imp='zenodo_accessrequests.views.requests.confirm',
-            ),
-        ),
-    )
-
-    InvenioFormatter(app_)
-    Babel(app_)
-    InvenioDB(app_)
-    InvenioAccounts(app_)
-    InvenioRecords(app_)
-    FlaskMenu(app_)
-    Mail(app_)
-    InvenioRecordsUI(app_)
-    InvenioAccess(app_)
-    ZenodoAccessRequests(app_)
-    InvenioPIDStore(app_)
-
-    app_.register_blueprint(request_blueprint)
-    app_.register_blueprint(settings_blueprint)
-    app_.register_blueprint(blueprint_user)
-    app_.register_blueprint(create_blueprint_from_app(app_))
-
+    app_ = create_app()
     with app_.app_context():
         yield app_
 
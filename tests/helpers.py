@@ -24,9 +24,95 @@
 
 from __future__ import absolute_import, print_function
 
-from flask import current_app
+import os
+from contextlib import contextmanager
 
+from flask import Flask, current_app
+from flask_babelex import Babel
+from flask_menu import Menu as FlaskMenu
+from invenio_access import InvenioAccess
+from invenio_accounts import InvenioAccounts
+from invenio_accounts.views import blueprint as blueprint_user
+from invenio_db import InvenioDB, db
+from invenio_formatter import InvenioFormatter
+from invenio_mail import InvenioMail as Mail
+from invenio_pidstore import InvenioPIDStore
+from invenio_records import InvenioRecords
+from invenio_records_ui import InvenioRecordsUI
+from invenio_records_ui.views import create_blueprint_from_app
+from sqlalchemy import event
+
+from zenodo_accessrequests import ZenodoAccessRequests
 from zenodo_accessrequests.models import AccessRequest
+from zenodo_accessrequests.views.api import blueprint as api_blueprint
+from zenodo_accessrequests.views.requests import blueprint as request_blueprint
+from zenodo_accessrequests.views.settings import \
+    blueprint as settings_blueprint
+
+
+def create_app(**config):
+    """Create the test application.
+
+    :param config: Configuration overriding the test configuration.
+    """
+    app_ = Flask('testapp')
+    app_.config.update(
+        TESTING=True,
+        CELERY_ALWAYS_EAGER=True,
+        CELERY_CACHE_BACKEND="memory",
+        CELERY_EAGER_PROPAGATES_EXCEPTIONS=True,
+        CELERY_RESULT_BACKEND="cache",
+        SQLALCHEMY_DATABASE_URI=os.environ.get(
+            'SQLALCHEMY_DATABASE_URI', 'sqlite://'
+        ),
+        SQLALCHEMY_TRACK_MODIFICATIONS=False,
+        SECRET_KEY='mysecret',
+        SUPPORT_EMAIL='info@zenodo.org',
+        WTF_CSRF_ENABLED=False,
+        SERVER_NAME='test.it',
+        RECORDS_UI_ENDPOINTS=dict(
+            recid=dict(
+                pid_type='recid',
+                route='/records/<pid_value>',
+                template='invenio_records_ui/detail.html',
+            ),
+            recid_access_request=dict(
+                pid_type='recid',
+                route='/records/<pid_value>/accessrequest',
+                template='zenodo_accessrequests/access_request.html',
+                view_imp='zenodo_accessrequests.views.requests.access_request',
+                record_class='zenodo_accessrequests.utils:RecordFields',
+                methods=['GET', 'POST'],
+            ),
+            recid_access_request_email_confirm=dict(
+                pid_type='recid',
+                route='/records/<pid_value>/accessrequest/<token>/confirm',
+                #  template='invenio_records_ui/detail.html',
+                view_imp='zenodo_accessrequests.views.requests.confirm',
+                record_class='zenodo_accessrequests.utils:RecordFields',
+            ),
+        ),
+    )
+    app_.config.update(config)
+
+    InvenioFormatter(app_)
+    Babel(app_)
+    InvenioDB(app_)
+    InvenioAccounts(app_)
+    InvenioRecords(app_)
+    FlaskMenu(app_)
+    Mail(app_)
+    InvenioRecordsUI(app_)
+    InvenioAccess(app_)
+    ZenodoAccessRequests(app_)
+    InvenioPIDStore(app_)
+
+    app_.register_blueprint(api_blueprint)
+    app_.register_blueprint(request_blueprint)
+    app_.register_blueprint(settings_blueprint)
+    app_.register_blueprint(blueprint_user)
+    app_.register_blueprint(create_blueprint_from_app(app_))
+    return app_
 
 
 def create_access_request(pid_value, users, confirmed):
@@ -42,3 +128,24 @@ def create_access_request(pid_value, users, confirmed):
         sender=sender if confirmed else None,
         justification="Bla bla bla",
     )
+
+
+@contextmanager
+def count_queries(parameters=False):
+    """Collect the SQL statements executed in the block.
+
+    :param parameters: Collect ``(statement, parameters)`` tuples instead of
+        the statements only.
+    :returns: List of the executed statements, filled in the block.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, params, *args):
+        statements.append((statement, params) if parameters else statement)
+
+    event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, 'before_cursor_execute',
+                     before_cursor_execute)
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Token cache tests."""
+
+from __future__ import absolute_import, print_function
+
+from datetime import datetime, timedelta
+
+from zenodo_accessrequests.cache import TokenCache
+
+
+def test_token_cache_get_set():
+    """Test caching of tokens."""
+    cache = TokenCache(maxsize=10, ttl=60)
+    assert cache.get('token1') is None
+    cache.set('token1', 1, dict(id=1))
+    assert cache.get('token1') == dict(id=1)
+    assert cache.get('token2') is None
+    assert len(cache) == 1
+
+
+def test_token_cache_lru():
+    """Test eviction of least recently used tokens."""
+    cache = TokenCache(maxsize=2, ttl=60)
+    cache.set('token1', 1, dict(id=1))
+    cache.set('token2', 2, dict(id=2))
+    assert cache.get('token1')
+    cache.set('token3', 3, dict(id=3))
+    assert len(cache) == 2
+    assert cache.get('token1')
+    assert cache.get('token2') is None
+    assert cache.get('token3')
+
+
+def test_token_cache_expiry():
+    """Test that entries expire with the ttl or the link."""
+    cache = TokenCache(maxsize=10, ttl=60)
+    cache.set('token1', 1, dict(id=1),
+              expires_at=datetime.utcnow() - timedelta(seconds=1))
+    assert cache.get('token1') is None
+    assert len(cache) == 0
+
+    cache = TokenCache(maxsize=10, ttl=0)
+    cache.set('token1', 1, dict(id=1))
+    assert cache.get('token1') is None
+
+
+def test_token_cache_evict_link():
+    """Test eviction of all tokens of a link."""
+    cache = TokenCache(maxsize=10, ttl=60)
+    cache.set('token1', 1, dict(id=1))
+    cache.set('token2', 1, dict(id=1))
+    cache.set('token3', 2, dict(id=2))
+    cache.evict_link(1)
+    assert cache.get('token1') is None
+    assert cache.get('token2') is None
+    assert cache.get('token3')
+    cache.clear()
+    assert len(cache) == 0
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Command line interface tests."""
+
+from __future__ import absolute_import, print_function
+
+from datetime import datetime, timedelta
+
+from click.testing import CliRunner
+from flask import current_app
+from flask.cli import ScriptInfo
+
+from zenodo_accessrequests.cli import backfill_links, rebuild_search_index, \
+    sweep_expired_links
+from zenodo_accessrequests.models import SecretLink
+
+
+def test_backfill_links(app, db, users):
+    """Test backfilling of record ids and extra data of links."""
+    with app.test_request_context():
+        datastore = current_app.extensions['security'].datastore
+        receiver = datastore.get_user(users['receiver']['id'])
+        links = [
+            SecretLink.create("Testing", receiver, dict(recid=i))
+            for i in range(1, 6)
+        ]
+        links[4].token = 'invalid'
+        for l in links:
+            l.recid = l._extra_data = l.token_digest = None
+        db.session.commit()
+        ids = [l.id for l in links]
+        token = links[0].token
+
+    runner = CliRunner()
+    script_info = ScriptInfo(create_app=lambda info: app)
+    result = runner.invoke(backfill_links, ['--batch-size', '2'],
+                           obj=script_info)
+    assert result.exit_code == 0
+    assert '4 links updated' in result.output
+    assert '1 links with invalid tokens' in result.output
+
+    with app.app_context():
+        assert [SecretLink.query.get(i).recid for i in ids] == \
+            [1, 2, 3, 4, None]
+        assert SecretLink.query.get(ids[0])._extra_data == dict(recid=1)
+        assert SecretLink.get_by_token(token).id == ids[0]
+
+        result = runner.invoke(backfill_links, obj=script_info)
+        assert '0 links updated' in result.output
+        assert 'invalid tokens' not in result.output
+
+
+def test_sweep_expired_links(app, db, users):
+    """Test revocation of expired links from the command line."""
+    with app.test_request_context():
+        datastore = current_app.extensions['security'].datastore
+        receiver = datastore.get_user(users['receiver']['id'])
+        for i in range(3):
+            SecretLink.create("Testing", receiver, dict(recid=1),
+                              expires_at=datetime.utcnow()-timedelta(days=1))
+        SecretLink.create("Testing", receiver, dict(recid=1))
+        db.session.commit()
+
+    runner = CliRunner()
+    script_info = ScriptInfo(create_app=lambda info: app)
+    result = runner.invoke(sweep_expired_links,
+                           ['--batch-size', '1', '--max-batches', '2'],
+                           obj=script_info)
+    assert result.exit_code == 0
+    assert '2 expired links revoked' in result.output
+
+    result = runner.invoke(sweep_expired_links, obj=script_info)
+    assert '1 expired links revoked' in result.output
+    with app.app_context():
+        assert SecretLink.query_valid().count() == 1
+
+
+def test_rebuild_search_index(app, db, users):
+    """Test rebuilding the search index of links."""
+    with app.test_request_context():
+        datastore = current_app.extensions['security'].datastore
+        receiver = datastore.get_user(users['receiver']['id'])
+        link = SecretLink.create("Testing", receiver, dict(recid=1))
+        db.session.commit()
+        # Bulk updates bypass the mapper events updating the index.
+        SecretLink.query.filter_by(id=link.id).update(
+            {SecretLink.title: "Renamed"})
+        db.session.commit()
+        assert SecretLink.search(receiver, "renamed").count() == 0
+
+    runner = CliRunner()
+    script_info = ScriptInfo(create_app=lambda info: app)
+    result = runner.invoke(rebuild_search_index, obj=script_info)
+    assert result.exit_code == 0
+
+    with app.app_context():
+        receiver = datastore.get_user(users['receiver']['id'])
+        assert SecretLink.search(receiver, "renamed").count() == 1
+        assert SecretLink.search(receiver, "testing").count() == 0
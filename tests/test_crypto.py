@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Encryption engine tests."""
+
+from __future__ import absolute_import, print_function
+
+from mock import Mock
+
+from zenodo_accessrequests.crypto import CachedEncryptedType, EngineCache, \
+    engines, get_fernet
+from zenodo_accessrequests.models import SecretLink
+
+
+def test_engine_cache():
+    """Test that engines are built once per kind and key."""
+    cache = EngineCache(maxsize=2)
+    factory = Mock(side_effect=lambda key: object())
+    e1 = cache.get('a', 'key1', factory)
+    assert cache.get('a', 'key1', factory) is e1
+    e2 = cache.get('b', 'key1', factory)
+    assert e2 is not e1
+    assert factory.call_count == 2
+
+    # Full cache is emptied.
+    cache.get('a', 'key2', factory)
+    assert cache.get('a', 'key1', factory) is not e1
+
+
+def test_get_fernet():
+    """Test shared Fernet engines."""
+    f = get_fernet('mysecret')
+    assert get_fernet('mysecret') is f
+    assert f.decrypt(get_fernet(b'mysecret').encrypt(b'a')) == b'a'
+    assert get_fernet('anothersecret') is not f
+
+
+def test_cached_encrypted_type(app, db):
+    """Test encryption with shared engines."""
+    keys = ['key1']
+    t = CachedEncryptedType(key=lambda: keys[0])
+    value = t.process_bind_param('secret', None)
+    assert value != 'secret'
+    assert t.process_result_value(value, None) == 'secret'
+    engine = t.engine
+    t.process_bind_param('secret', None)
+    assert t.engine is engine
+
+    keys[0] = 'key2'
+    assert t.process_bind_param('secret', None) != value
+    assert t.engine is not engine
+
+
+def test_secret_link_token_column(app, db, users):
+    """Test that the token column reuses the engine of the key."""
+    column_type = SecretLink.__table__.c.token.type
+    with app.app_context():
+        engines.clear()
+        l = SecretLink(owner_user_id=users['receiver']['id'], token='abc')
+        db.session.add(l)
+        db.session.commit()
+        engine = column_type.engine
+        db.session.expire(l)
+        assert l.token == 'abc'
+        assert column_type.engine is engine
@@ -24,7 +24,13 @@
 
 from __future__ import absolute_import, print_function
 
+from datetime import date, datetime
+
+import pytest
+from flask import current_app
+
 from zenodo_accessrequests.helpers import Ordering, QueryOrdering
+from zenodo_accessrequests.models import SecretLink
 
 
 def test_selected(app):
@@ -75,3 +81,81 @@ def test_items(app):
     # FIXME
     # assert 'a' == QueryOrdering(q, ['a', 'b'], '-a').items().element.text
     assert q == QueryOrdering(q, ['a', 'b'], 'c').items()
+
+
+def _create_links(receiver):
+    """Create links with duplicate titles and missing expiry dates."""
+    for i in range(7):
+        SecretLink.create(
+            "Link {0}".format(i % 3), receiver, dict(recid=str(i)),
+            expires_at=date(2100, 1, 1 + i % 2) if i % 3 else None,
+        )
+
+
+@pytest.mark.parametrize('order', [
+    'title', '-title', 'created', '-created', 'expires_at', '-expires_at',
+    None,
+])
+def test_keyset_pagination(app, db, users, order):
+    """Test keyset pagination forwards and backwards."""
+    with app.test_request_context():
+        datastore = current_app.extensions['security'].datastore
+        receiver = datastore.get_user(users['receiver']['id'])
+        _create_links(receiver)
+        db.session.commit()
+
+        query = SecretLink.query_by_owner(receiver)
+        ordering = QueryOrdering(
+            query, ['title', 'created', 'expires_at'], order)
+
+        # Expected ordering: by column (NULLs last when ascending) and id.
+        name = ordering.selected() or 'id'
+        asc = not name.startswith('-')
+        name = name.lstrip('-')
+
+        def key(l):
+            value = getattr(l, name)
+            return (value is None, value or '', l.id)
+        expected = [l.id for l in sorted(query.all(), key=key)]
+        if not asc:
+            expected.reverse()
+
+        pages, cursor = [], None
+        while True:
+            p = ordering.paginate(3, cursor=cursor)
+            pages.append([l.id for l in p.items])
+            if not p.has_next:
+                break
+            cursor = p.next_cursor
+        assert [len(ids) for ids in pages] == [3, 3, 1]
+        assert sum(pages, []) == expected
+
+        while p.has_prev:
+            p = ordering.paginate(3, cursor=p.prev_cursor)
+            assert [l.id for l in p.items] == pages.pop(-2)
+        assert p.has_next
+        assert not p.has_prev
+        assert p.prev_cursor is None
+
+
+def test_keyset_pagination_cursor(app, db, users):
+    """Test invalid cursors."""
+    with app.test_request_context():
+        datastore = current_app.extensions['security'].datastore
+        receiver = datastore.get_user(users['receiver']['id'])
+        _create_links(receiver)
+        db.session.commit()
+
+        query = SecretLink.query_by_owner(receiver)
+        cursor = QueryOrdering(query, ['title', 'created'], 'created') \
+            .paginate(3).next_cursor
+        assert cursor
+
+        # Cursors only apply to the ordering they were created for.
+        with pytest.raises(ValueError):
+            QueryOrdering(query, ['title', 'created'], 'title').paginate(
+                3, cursor=cursor)
+        for cursor in ['invalid', 'W10', 'WyJ4IiwiaWQiLDEsMV0']:
+            with pytest.raises(ValueError):
+                QueryOrdering(query, ['title'], None).paginate(
+                    3, cursor=cursor)
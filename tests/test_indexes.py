@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Database index tests."""
+
+from __future__ import absolute_import, print_function
+
+from datetime import datetime
+
+import pytest
+from helpers import count_queries
+
+from zenodo_accessrequests.helpers import QueryOrdering
+from zenodo_accessrequests.models import AccessRequest, RequestStatus, \
+    SecretLink
+
+
+class User(object):
+    """User stand-in for the query helpers."""
+
+    id = 1
+
+
+def statement_plan(db, statement, params=()):
+    """Get the SQLite query plan of an SQL statement."""
+    if db.engine.name != 'sqlite':
+        pytest.skip('Query plans are only checked on SQLite.')
+    return ' '.join(
+        row[-1] for row in db.session.connection().execute(
+            'EXPLAIN QUERY PLAN {0}'.format(statement), params)
+    )
+
+
+def query_plan(db, query):
+    """Get the SQLite query plan of a query."""
+    compiled = query.statement.compile(dialect=db.engine.dialect)
+    params = tuple(compiled.params[name] for name in compiled.positiontup)
+    return statement_plan(db, compiled, params)
+
+
+def test_pending_requests_plan(app, db):
+    """Test that the pending requests are listed from the index."""
+    query = AccessRequest.query_by_receiver(User).filter_by(
+        status=RequestStatus.PENDING).order_by('created')
+    plan = query_plan(db, query)
+    assert 'ix_accessrequests_request_receiver_status_created' in plan
+    assert 'TEMP B-TREE' not in plan
+
+
+@pytest.mark.parametrize('order', [
+    'title', '-title', 'created', '-created', 'expires_at', '-expires_at'])
+def test_links_plan(app, db, order):
+    """Test that the pages of links of an owner are read from an index."""
+    query = SecretLink.query_by_owner(User).filter(
+        SecretLink.revoked_at.is_(None))
+    ordering = QueryOrdering(query, ['title', 'created', 'expires_at'], order)
+    link = SecretLink(id=1, title='Link', created=datetime(2026, 1, 1),
+                      expires_at=datetime(2026, 1, 1))
+
+    with count_queries(parameters=True) as statements:
+        pagination = ordering.paginate(20)
+        ordering.paginate(20, cursor=pagination.dump_cursor(True, link))
+        ordering.paginate(20, cursor=pagination.dump_cursor(False, link))
+        link.expires_at = None
+        ordering.paginate(20, cursor=pagination.dump_cursor(True, link))
+        ordering.paginate(20, cursor=pagination.dump_cursor(False, link))
+
+    statements = [(statement, params) for statement, params in statements
+                  if statement.startswith('SELECT')]
+    assert statements
+    for statement, params in statements:
+        plan = statement_plan(db, statement, params)
+        assert 'ix_accessrequests_link_owner_revoked_at_{0}'.format(
+            order.lstrip('-')) in plan
+        assert 'TEMP B-TREE' not in plan
+
+
+@pytest.mark.parametrize('model,column,index', [
+    (AccessRequest, 'sender_user_id',
+     'ix_accessrequests_request_sender_user_id'),
+    (AccessRequest, 'link_id', 'ix_accessrequests_request_link_id'),
+    (SecretLink, 'recid', 'ix_accessrequests_link_recid'),
+])
+def test_lookup_plans(app, db, model, column, index):
+    """Test that requests and links are looked up from indexes."""
+    query = model.query.filter_by(**{column: 1})
+    assert index in query_plan(db, query)
+
+
+def test_expired_links_plan(app, db):
+    """Test that expired links are found from the index."""
+    query = SecretLink.query.filter(
+        SecretLink.revoked_at.is_(None),
+        SecretLink.expires_at <= '2026-01-01',
+    ).order_by(SecretLink.expires_at)
+    plan = query_plan(db, query)
+    assert 'ix_accessrequests_link_revoked_at_expires_at' in plan
+    assert 'TEMP B-TREE' not in plan
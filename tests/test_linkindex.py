@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Shared link index tests."""
+
+from __future__ import absolute_import, print_function
+
+from datetime import datetime
+
+from flask import current_app
+from mock import patch
+from sqlalchemy.exc import OperationalError
+
+from zenodo_accessrequests.linkindex import HEADER, LinkIndex
+from zenodo_accessrequests.models import SecretLink
+from zenodo_accessrequests.proxies import current_zenodo_accessrequests
+
+
+def _create_links(users, n, **kwargs):
+    """Create a number of secret links."""
+    datastore = current_app.extensions['security'].datastore
+    receiver = datastore.get_user(users['receiver']['id'])
+    return [SecretLink.create("Link", receiver, dict(recid=1), **kwargs)
+            for i in range(n)]
+
+
+def test_build_lookup(app, db, users, tmpdir):
+    """Test building and querying the index."""
+    with app.test_request_context():
+        index = LinkIndex(tmpdir.join('links.idx').strpath)
+        assert index._get_mmap() is None
+
+        links = _create_links(users, 3)
+        expires_at = datetime(2100, 1, 1)
+        links += _create_links(users, 1, expires_at=expires_at)
+        links[1].revoke()
+        db.session.commit()
+
+        index.build()
+        assert index.lookup(links[0].id) == (False, None)
+        assert index.lookup(links[1].id) == (True, None)
+        assert index.lookup(links[3].id) == (False, expires_at)
+        assert index.lookup(links[3].id + 1) is None
+        assert index.lookup(0) is None
+
+
+def test_update(app, db, users, tmpdir):
+    """Test incremental updates of the index."""
+    with app.test_request_context():
+        path = tmpdir.join('links.idx').strpath
+        index = LinkIndex(path, refresh_interval=-1)
+        other = LinkIndex(path, refresh_interval=-1)
+
+        links = _create_links(users, 2)
+        db.session.commit()
+        index.build()
+
+        # Revocation in this process is written to the shared mapping.
+        links[0].revoke()
+        index.mark_revoked(links[0].id)
+        assert other.lookup(links[0].id) == (True, None)
+
+        # Links created and revoked elsewhere are picked up by updates.
+        links += _create_links(users, 1)
+        links[1].revoked_at = datetime.utcnow()
+        db.session.commit()
+        assert other.lookup(links[2].id) == (False, None)
+        assert other.lookup(links[1].id) == (True, None)
+        assert index.lookup(links[2].id) == (False, None)
+
+        # Revocations undone elsewhere are cleared by updates.
+        links[1].revoked_at = None
+        db.session.commit()
+        assert other.lookup(links[1].id) == (False, None)
+
+
+def test_revoke_commit(app, db, users, tmpdir):
+    """Test that revocations are only written to the index once committed."""
+    with app.test_request_context():
+        index = LinkIndex(tmpdir.join('links.idx').strpath)
+        current_zenodo_accessrequests.link_index = index
+        links = _create_links(users, 3)
+        db.session.commit()
+        index.build()
+
+        links[0].revoke()
+        SecretLink.revoke_many(ids=[links[1].id])
+        assert index.lookup(links[0].id) == (False, None)
+        db.session.rollback()
+        db.session.commit()
+        assert index.lookup(links[0].id) == (False, None)
+        assert index.lookup(links[1].id) == (False, None)
+
+        # Revocations in savepoints which are rolled back are discarded.
+        savepoint = db.session.begin_nested()
+        links[2].revoke()
+        savepoint.rollback()
+        with db.session.begin_nested():
+            links[0].revoke()
+        SecretLink.revoke_many(ids=[links[1].id])
+        db.session.commit()
+        assert index.lookup(links[0].id) == (True, None)
+        assert index.lookup(links[1].id) == (True, None)
+        assert index.lookup(links[2].id) == (False, None)
+
+
+def test_refresh(app, db, users, tmpdir):
+    """Test that lookups neither build the index nor fail on errors."""
+    with app.test_request_context():
+        index = LinkIndex(tmpdir.join('links.idx').strpath,
+                          refresh_interval=-1)
+        links = _create_links(users, 1)
+        db.session.commit()
+
+        # A missing index is not built by lookups.
+        assert index.lookup(links[0].id) is None
+        assert index._get_mmap(force=True) is None
+        assert index.refresh()
+        assert index.lookup(links[0].id) == (False, None)
+
+        # Lookups fall back to the database if the index cannot be updated.
+        error = OperationalError('SELECT', {}, Exception())
+        with patch.object(db.session, 'query', side_effect=error):
+            assert index.lookup(links[0].id) == (False, None)
+            mm = index._get_mmap()
+            magic, count, synced_at, max_id = HEADER.unpack_from(mm, 0)
+            HEADER.pack_into(mm, 0, magic, count, synced_at - 600, max_id)
+            assert index.lookup(links[0].id) is None
+        assert SecretLink.query.count() == 1
+
+
+def test_stale(app, db, users, tmpdir):
+    """Test that a stale index is not used."""
+    with app.test_request_context():
+        index = LinkIndex(tmpdir.join('links.idx').strpath, max_age=60)
+        links = _create_links(users, 1)
+        db.session.commit()
+        index.build()
+        assert index.lookup(links[0].id) == (False, None)
+
+        mm = index._get_mmap()
+        magic, count, synced_at, max_id = HEADER.unpack_from(mm, 0)
+        HEADER.pack_into(mm, 0, magic, count, synced_at - 120, max_id)
+        with patch.object(index, 'refresh'):
+            assert index.lookup(links[0].id) is None
+
+
+def test_validate_token(app, db, users, tmpdir):
+    """Test token validation using the index."""
+    with app.test_request_context():
+        current_zenodo_accessrequests.token_cache.ttl = 0
+        current_zenodo_accessrequests.link_index = LinkIndex(
+            tmpdir.join('links.idx').strpath)
+
+        links = _create_links(users, 3)
+        db.session.commit()
+        current_zenodo_accessrequests.link_index.build()
+
+        with patch.object(SecretLink, 'query') as query:
+            assert SecretLink.validate_token(links[0].token, dict(recid=1))
+            assert not query.method_calls
+
+        links[0].revoke()
+        db.session.commit()
+        with patch.object(SecretLink, 'query') as query:
+            assert not SecretLink.validate_token(
+                links[0].token, dict(recid=1))
+            assert not query.method_calls
+
+        SecretLink.revoke_many(ids=[links[1].id, links[2].id])
+        db.session.commit()
+        with patch.object(SecretLink, 'query') as query:
+            for l in links[1:]:
+                assert not SecretLink.validate_token(l.token, dict(recid=1))
+            assert not query.method_calls
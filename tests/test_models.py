@@ -28,14 +28,18 @@ from datetime import datetime, timedelta
 
 import pytest
 from flask import current_app
-from helpers import create_access_request
-from mock import Mock
+from helpers import count_queries, create_access_request
+from mock import Mock, patch
+from sqlalchemy import event, inspect
 
 from zenodo_accessrequests.errors import InvalidRequestStateError
-from zenodo_accessrequests.models import AccessRequest, RequestStatus, \
-    SecretLink
+from zenodo_accessrequests.models import AccessRequest, PendingRequestCount, \
+    RequestStatus, SecretLink
+from zenodo_accessrequests.proxies import current_zenodo_accessrequests
 from zenodo_accessrequests.signals import link_created, link_revoked, \
-    request_accepted, request_confirmed, request_created, request_rejected
+    links_revoked, request_accepted, request_confirmed, request_created, \
+    request_rejected
+from zenodo_accessrequests.tokens import SecretLinkFactory
 
 
 def test_create_nouser(app, db, users, record_example):
@@ -310,3 +314,343 @@ def test_get_absolute_url(app, db, users):
         url = l.get_absolute_url('invenio_records_ui.recid')
         assert "/records/1?" in url
         assert "token={0}".format(l.token) in url
+
+
+def test_validate_token_cache(app, db, users):
+    """Test caching of validated tokens."""
+    with app.test_request_context():
+        datastore = current_app.extensions['security'].datastore
+        receiver = datastore.get_user(users['receiver']['id'])
+        cache = current_zenodo_accessrequests.token_cache
+
+        l = SecretLink.create("Testing", receiver, dict(recid='1'))
+        db.session.commit()
+        assert not SecretLink.validate_token(l.token, dict(recid='2'))
+        assert len(cache) == 0
+
+        assert SecretLink.validate_token(l.token, dict(recid='1'))
+        assert len(cache) == 1
+        with patch.object(SecretLink, 'query') as query:
+            assert SecretLink.validate_token(l.token, dict(recid='1'))
+            assert not SecretLink.validate_token(l.token, dict(recid='2'))
+            assert not query.method_calls
+
+        l.revoke()
+        assert len(cache) == 0
+        assert not SecretLink.validate_token(l.token, dict(recid='1'))
+
+
+def test_extra_data_column(app, db, users):
+    """Test that extra data is stored without decoding the token."""
+    with app.test_request_context():
+        datastore = current_app.extensions['security'].datastore
+        receiver = datastore.get_user(users['receiver']['id'])
+
+        l1 = SecretLink.create("Testing", receiver, dict(recid='1'))
+        l2 = SecretLink.create("Testing", receiver, dict(recid=2))
+        l3 = SecretLink.create("Testing", receiver, dict(doi='10.5281/1'))
+        db.session.commit()
+        assert (l1.recid, l2.recid, l3.recid) == (1, 2, None)
+
+        assert SecretLink.query_by_record(1).all() == [l1]
+        assert SecretLink.query_by_record(2).all() == [l2]
+
+        with patch.object(SecretLinkFactory, 'load_token') as load_token:
+            assert l1.extra_data == dict(recid='1')
+            assert "/records/2?" in l2.get_absolute_url(
+                'invenio_records_ui.recid')
+            assert not load_token.called
+
+        # Links created before the extra data column was introduced.
+        l1._extra_data = l1.recid = None
+        db.session.commit()
+        assert l1.extra_data == dict(recid='1')
+        assert l1.backfill()
+        assert (l1.recid, l1._extra_data) == (1, dict(recid='1'))
+
+
+def test_get_by_token(app, db, users):
+    """Test looking up links by token."""
+    with app.test_request_context():
+        datastore = current_app.extensions['security'].datastore
+        receiver = datastore.get_user(users['receiver']['id'])
+
+        l1 = SecretLink.create("Testing", receiver, dict(recid=1))
+        l2 = SecretLink.create("Testing", receiver, dict(recid=1))
+        db.session.commit()
+        assert l1.token_digest != l2.token_digest
+        assert l1.token not in l1.token_digest
+
+        assert SecretLink.get_by_token(l1.token) == l1
+        assert SecretLink.get_by_token(l2.token.encode('utf8')) == l2
+        assert SecretLink.get_by_token(l1.token[:-1]) is None
+        assert SecretLink.get_by_token('') is None
+
+
+def test_query_by_owner_deferred_token(app, db, users):
+    """Test that tokens are only loaded if requested."""
+    with app.test_request_context():
+        datastore = current_app.extensions['security'].datastore
+        receiver = datastore.get_user(users['receiver']['id'])
+
+        SecretLink.create("Testing", receiver, dict(recid='1'))
+        db.session.commit()
+        db.session.expunge_all()
+        receiver = datastore.get_user(users['receiver']['id'])
+
+        l = SecretLink.query_by_owner(receiver).one()
+        assert 'token' in inspect(l).unloaded
+        assert l.token
+        db.session.expunge(l)
+
+        l = SecretLink.query_by_owner(receiver, with_token=True).one()
+        assert 'token' not in inspect(l).unloaded
+        db.session.expunge(l)
+
+        SecretLink.create("Testing", receiver, dict(recid='2'))
+        db.session.commit()
+        links = SecretLink.query_by_owner(receiver).order_by(
+            SecretLink.id).all()
+        with count_queries() as statements:
+            assert SecretLink.load_tokens(links[:1]) == links[:1]
+            SecretLink.load_tokens(links[:1])
+        assert len(statements) == 1
+        assert 'token' not in inspect(links[0]).unloaded
+        assert 'token' in inspect(links[1]).unloaded
+        assert links[0].title == "Testing"
+
+
+def test_validate_token_query(app, db, users):
+    """Test that validation only queries the state of the link."""
+    with app.test_request_context():
+        datastore = current_app.extensions['security'].datastore
+        receiver = datastore.get_user(users['receiver']['id'])
+        current_zenodo_accessrequests.token_cache.ttl = 0
+
+        l = SecretLink.create("Testing", receiver, dict(recid='1'),
+                              expires_at=datetime.utcnow()+timedelta(days=2))
+        db.session.commit()
+        token, link_id = l.token, l.id
+        db.session.expunge_all()
+
+        with count_queries() as statements:
+            assert SecretLink.validate_token(token, dict(recid='1'))
+        assert len(statements) == 1
+        assert 'accessrequests_link.token' not in statements[0]
+        assert not db.session.identity_map
+
+        SecretLink.query.filter_by(id=link_id).update(
+            dict(expires_at=datetime.utcnow()-timedelta(days=1)))
+        assert not SecretLink.validate_token(token, dict(recid='1'))
+        assert SecretLink.query_valid().count() == 0
+
+
+def test_revoke_many(app, db, users):
+    """Test revocation of several links."""
+    mock_links_revoked = Mock()
+
+    with app.test_request_context():
+        datastore = current_app.extensions['security'].datastore
+        receiver = datastore.get_user(users['receiver']['id'])
+        sender = datastore.get_user(users['sender']['id'])
+        cache = current_zenodo_accessrequests.token_cache
+
+        links = [
+            SecretLink.create("Testing", receiver, dict(recid=1)),
+            SecretLink.create("Testing", receiver, dict(recid=1)),
+            SecretLink.create("Testing", receiver, dict(recid=2)),
+            SecretLink.create("Testing", sender, dict(recid=2)),
+            SecretLink.create("Testing", sender, dict(recid=3)),
+        ]
+        links[4].created = datetime.utcnow() - timedelta(days=10)
+        db.session.commit()
+        ids = [l.id for l in links]
+        assert SecretLink.validate_token(links[0].token, dict(recid=1))
+        assert len(cache) == 1
+
+        with links_revoked.connected_to(mock_links_revoked):
+            assert SecretLink.revoke_many(recid=1) == ids[:2]
+            mock_links_revoked.assert_called_once_with(
+                SecretLink, link_ids=ids[:2])
+            assert links[0].is_revoked() and links[1].is_revoked()
+            assert not links[2].is_revoked()
+            assert len(cache) == 0
+
+            assert SecretLink.revoke_many(recid=1) == []
+            assert mock_links_revoked.call_count == 1
+
+            assert SecretLink.revoke_many(owner=sender, ids=ids[2:4]) == \
+                ids[3:4]
+            assert SecretLink.revoke_many(ids=[]) == []
+            assert SecretLink.revoke_many(
+                created_before=datetime.utcnow() - timedelta(days=1)) == \
+                ids[4:]
+            assert mock_links_revoked.call_count == 3
+        db.session.commit()
+
+        assert [l.is_revoked() for l in SecretLink.query.order_by(
+            SecretLink.id)] == [True, True, False, True, True]
+        with pytest.raises(AssertionError):
+            SecretLink.revoke_many()
+
+
+def test_search(app, db, users):
+    """Test full-text search of links."""
+    with app.test_request_context():
+        datastore = current_app.extensions['security'].datastore
+        receiver = datastore.get_user(users['receiver']['id'])
+        sender = datastore.get_user(users['sender']['id'])
+
+        l1 = SecretLink.create("Ocean data", receiver, dict(recid='1'),
+                               description="Temperature of the ocean")
+        l2 = SecretLink.create("Soil samples", receiver, dict(recid='2'),
+                               description="Ocean floor and beach soil")
+        l3 = SecretLink.create("Sea temperature", receiver, dict(recid='3'),
+                               description="Surface temperature of an ocean")
+        SecretLink.create("Ocean", sender, dict(recid='4'))
+        db.session.commit()
+
+        def search(q, **kwargs):
+            return [l.id for l in SecretLink.search(receiver, q, **kwargs)]
+
+        # Ranking
+        assert search("ocean")[0] == l1.id
+        assert set(search("ocean")) == set([l1.id, l2.id, l3.id])
+        # All terms must match, as word prefixes
+        assert set(search("temperature ocean")) == set([l1.id, l3.id])
+        assert search("samp") == [l2.id]
+        assert search("cean") == []
+        assert search("") == []
+        assert search('"*') == []
+        assert sorted(search("ocean", ranked=False)) == \
+            [l1.id, l2.id, l3.id]
+
+        # Changed links are updated in the index
+        l3.title = "Lake sediments"
+        l3.description = "Grain size"
+        db.session.commit()
+        assert search("sediments") == [l3.id]
+        assert set(search("ocean")) == set([l1.id, l2.id])
+        l3.description = "Surface temperature of an ocean"
+        db.session.commit()
+
+        # Revoked and deleted links are removed from the index
+        l1.revoke()
+        SecretLink.revoke_many(ids=[l2.id])
+        assert search("ocean") == [l3.id]
+        db.session.delete(l3)
+        db.session.commit()
+        assert search("ocean") == []
+        assert search("lake") == []
+
+
+def test_pending_request_count(app, db, users, record_example):
+    """Test counters of pending access requests."""
+    pid_value, record = record_example
+
+    with app.test_request_context():
+        receiver_id = users['receiver']['id']
+        assert PendingRequestCount.get(receiver_id) == 0
+
+        r1 = create_access_request(pid_value, users, confirmed=True)
+        r2 = create_access_request(pid_value, users, confirmed=True)
+        r3 = create_access_request(pid_value, users, confirmed=False)
+        assert PendingRequestCount.get(receiver_id) == 2
+
+        r3.confirm_email()
+        assert PendingRequestCount.get(receiver_id) == 3
+        r1.accept()
+        r2.reject()
+        assert PendingRequestCount.get(receiver_id) == 1
+        assert PendingRequestCount.get(users['sender']['id']) == 0
+        db.session.commit()
+
+        PendingRequestCount.query.filter_by(user_id=receiver_id).update(
+            {PendingRequestCount.count: 10})
+        PendingRequestCount.recompute(user_id=users['sender']['id'])
+        assert PendingRequestCount.get(receiver_id) == 10
+        PendingRequestCount.recompute()
+        assert PendingRequestCount.get(receiver_id) == 1
+
+
+def test_pending_request_count_changes(app, db, users, record_example):
+    """Test counting requests changed without the request methods."""
+    pid_value, record = record_example
+    receiver_id, sender_id = users['receiver']['id'], users['sender']['id']
+
+    with app.test_request_context():
+        r1 = create_access_request(pid_value, users, confirmed=True)
+        r2 = create_access_request(pid_value, users, confirmed=True)
+        r3 = create_access_request(pid_value, users, confirmed=True)
+        db.session.commit()
+        assert PendingRequestCount.get(receiver_id) == 3
+
+        # Edits, e.g. in the admin interface.
+        r1.status = RequestStatus.REJECTED
+        r2.receiver_user_id = sender_id
+        db.session.commit()
+        assert PendingRequestCount.get(receiver_id) == 1
+        assert PendingRequestCount.get(sender_id) == 1
+        r1.status = RequestStatus.PENDING
+        db.session.commit()
+        assert PendingRequestCount.get(receiver_id) == 2
+
+        db.session.delete(r3)
+        db.session.commit()
+        assert PendingRequestCount.get(receiver_id) == 1
+
+        # Several requests inserted by the same flush, e.g. when imported.
+        PendingRequestCount.query.delete()
+        db.session.add_all([AccessRequest(
+            status=RequestStatus.PENDING, recid=pid_value,
+            receiver_user_id=sender_id, sender_full_name="Another Name",
+            sender_email="anotheremail@example.org", justification="Bla",
+        ) for i in range(3)])
+        db.session.commit()
+        assert PendingRequestCount.get(sender_id) == 3
+
+
+def test_pending_request_count_race(app, db, users):
+    """Test creating a counter concurrently created by another transaction."""
+    table = PendingRequestCount.__table__
+    receiver_id = users['receiver']['id']
+
+    def insert_counter(connection, name):
+        # Runs before the savepoint of the insert is created.
+        connection.execute(table.insert().values(user_id=receiver_id,
+                                                 count=1))
+
+    with app.test_request_context():
+        connection = db.session.connection()
+        event.listen(connection, 'savepoint', insert_counter, once=True)
+        PendingRequestCount.increment(receiver_id)
+        assert PendingRequestCount.get(receiver_id) == 2
+
+
+@pytest.mark.parametrize('load,expected', [
+    ((), 1 + 1 + 3),
+    (('sender', 'link'), 1),
+    (dict(sender='selectin', link='joined'), 2),
+])
+def test_query_by_receiver_load(app, db, users, record_example, load,
+                                expected):
+    """Test eager loading of relationships of access requests."""
+    pid_value, record = record_example
+
+    with app.test_request_context():
+        for i in range(3):
+            create_access_request(pid_value, users, confirmed=True)
+        for r in AccessRequest.query.all():
+            r.accept()
+        db.session.commit()
+        db.session.expunge_all()
+        receiver = current_app.extensions['security'].datastore.get_user(
+            users['receiver']['id'])
+
+        with count_queries() as statements:
+            for r in AccessRequest.query_by_receiver(receiver, load=load):
+                assert r.sender.id == users['sender']['id']
+                assert r.link.title
+        # Without eager loading: one query for the (same) sender and for
+        # each link.
+        assert len(statements) == expected
@@ -30,8 +30,10 @@ from invenio_pidstore.errors import PIDDoesNotExistError
 from mock import patch
 
 from zenodo_accessrequests.models import AccessRequest
+from zenodo_accessrequests.proxies import current_zenodo_accessrequests
 from zenodo_accessrequests.receivers import _send_notification, \
     create_secret_link
+from zenodo_accessrequests.utils import get_record_fields
 
 
 def test_send_notification(app, db):
@@ -72,3 +74,19 @@ def test_create_secret_link_norecord(app, db, users):
                    return_value=None):
             with pytest.raises(PIDDoesNotExistError):
                 r = create_access_request("1", users, confirmed=True)
+
+
+def test_accept_record_memo(app, db, users, record_example,
+                            access_request_confirmed):
+    """Test that accepting a request looks up the record once."""
+    current_zenodo_accessrequests.record_cache.ttl = 0
+    # A new application context, as the fixture memoized the record.
+    with app.app_context(), app.test_request_context():
+        r = AccessRequest.query.filter_by(id=access_request_confirmed).first()
+        with patch('invenio_mail.tasks.send_email.delay') as send_email, \
+                patch('zenodo_accessrequests.utils.get_record_fields',
+                      wraps=get_record_fields) as fields:
+            r.accept()
+        assert send_email.called
+        assert r.link.title == "Registered"
+        assert fields.call_count == 1
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Record cache tests."""
+
+from __future__ import absolute_import, print_function
+
+import pytest
+from mock import ANY, Mock, patch
+from simplekv.memory import DictStore
+
+from zenodo_accessrequests.recordcache import KVBackend, LRUBackend, \
+    RecordCache
+
+RECORD = dict(title='Test', owners=[1], description='Not cached')
+
+
+@pytest.mark.parametrize('backend', [
+    LRUBackend, lambda: KVBackend(DictStore()),
+])
+def test_record_cache(backend):
+    """Test caching of record fields."""
+    cache = RecordCache(backend(), ['title', 'owners', 'doi'], ttl=60)
+    assert cache.get(1) is None
+    assert cache.set(1, RECORD) == dict(title='Test', owners=[1])
+    assert cache.get('1') == dict(title='Test', owners=[1])
+    assert cache.get(2) is None
+
+    # Entries are copies.
+    cache.get(1)['title'] = 'Changed'
+    assert cache.get(1)['title'] == 'Test'
+
+    cache.delete(1)
+    assert cache.get(1) is None
+    cache.delete(1)
+
+
+def test_record_cache_expiry():
+    """Test that entries expire with the ttl."""
+    cache = RecordCache(LRUBackend(), ['title'], ttl=60)
+    with patch('zenodo_accessrequests.recordcache.time.time',
+               return_value=1000):
+        cache.set(1, RECORD)
+    with patch('zenodo_accessrequests.recordcache.time.time',
+               return_value=1059):
+        assert cache.get(1)
+    with patch('zenodo_accessrequests.recordcache.time.time',
+               return_value=1060):
+        assert cache.get(1) is None
+
+    cache = RecordCache(LRUBackend(), ['title'], ttl=0)
+    assert cache.set(1, RECORD) == dict(title='Test')
+    assert cache.get(1) is None
+
+
+def test_lru_backend():
+    """Test eviction of least recently used entries."""
+    backend = LRUBackend(maxsize=2)
+    backend.set('1', 1)
+    backend.set('2', 2)
+    assert backend.get('1') == 1
+    backend.set('3', 3)
+    assert backend.get('1') == 1
+    assert backend.get('2') is None
+    assert backend.get('3') == 3
+    backend.clear()
+    assert backend.get('1') is None
+
+
+def test_kv_backend_ttl():
+    """Test that stores supporting a time-to-live expire the entries."""
+    store = Mock(ttl_support=True)
+    RecordCache(KVBackend(store), ['title'], ttl=60).set(1, RECORD)
+    store.put.assert_called_once_with(
+        'accessrequests_record_1', ANY, ttl_secs=60)
+
+    store = Mock(spec=DictStore())
+    RecordCache(KVBackend(store), ['title'], ttl=60).set(1, RECORD)
+    store.put.assert_called_once_with('accessrequests_record_1', ANY)
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Background task tests."""
+
+from __future__ import absolute_import, print_function
+
+from datetime import datetime, timedelta
+
+from flask import current_app
+from mock import Mock, patch
+
+from zenodo_accessrequests.models import SecretLink
+from zenodo_accessrequests.signals import links_revoked
+from zenodo_accessrequests.tasks import sweep_expired_links
+
+
+def test_sweep_expired_links(app, db, users):
+    """Test revocation of expired links."""
+    mock_links_revoked = Mock()
+
+    with app.test_request_context():
+        datastore = current_app.extensions['security'].datastore
+        receiver = datastore.get_user(users['receiver']['id'])
+        past = datetime.utcnow() - timedelta(days=1)
+        future = datetime.utcnow() + timedelta(days=1)
+        links = [
+            SecretLink.create("Testing", receiver, dict(recid=1),
+                              expires_at=expires_at)
+            for expires_at in (past, past, past, future, None)
+        ]
+        db.session.commit()
+        ids = [l.id for l in links]
+
+        app.config.update(ACCESSREQUESTS_SWEEP_BATCH_SIZE=2,
+                          ACCESSREQUESTS_SWEEP_MAX_BATCHES=1)
+        with links_revoked.connected_to(mock_links_revoked), \
+                patch.object(sweep_expired_links, 'apply_async') as apply:
+            sweep_expired_links()
+            mock_links_revoked.assert_called_once_with(
+                SecretLink, link_ids=ids[:2])
+            assert apply.called
+
+            apply.reset_mock()
+            sweep_expired_links()
+            assert mock_links_revoked.call_args[1] == dict(link_ids=ids[2:3])
+            assert not apply.called
+
+            sweep_expired_links()
+            assert mock_links_revoked.call_count == 2
+
+        assert [SecretLink.query.get(i).is_revoked() for i in ids] == \
+            [True, True, True, False, False]
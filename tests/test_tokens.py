@@ -27,12 +27,13 @@ from __future__ import absolute_import, print_function
 from datetime import datetime, timedelta
 
 import pytest
-from itsdangerous import BadData, BadSignature, JSONWebSignatureSerializer, \
-    SignatureExpired
+from itsdangerous import BadData, BadHeader, BadSignature, \
+    JSONWebSignatureSerializer, SignatureExpired
 
-from zenodo_accessrequests.tokens import EmailConfirmationSerializer, \
-    EncryptedTokenMixIn, SecretLinkFactory, SecretLinkSerializer, \
-    TimedSecretLinkSerializer
+from zenodo_accessrequests.tokens import CompactSecretLinkSerializer, \
+    EmailConfirmationSerializer, EncryptedTokenMixIn, SecretLinkFactory, \
+    SecretLinkSerializer, TimedSecretLinkSerializer, get_serializer, \
+    load_header
 
 
 def test_email_confirmation_serializer_create_validate(app, db):
@@ -230,3 +231,216 @@ def test_secretlink_factory_load_token(app, db):
         with pytest.raises(SignatureExpired):
             SecretLinkFactory.load_token(t)
         assert SecretLinkFactory.load_token(t, force=True) is not None
+
+
+def test_serializer_registry(app, db):
+    """Test that serializers are reused until the secret key changes."""
+    with app.app_context():
+        s1 = get_serializer(SecretLinkSerializer, 'HS256')
+        assert get_serializer(SecretLinkSerializer, 'HS256') is s1
+        assert get_serializer(SecretLinkSerializer, 'HS512') is not s1
+        assert get_serializer(TimedSecretLinkSerializer, 'HS256') is not s1
+
+        app.config['SECRET_KEY'] = 'anothersecret'
+        s2 = get_serializer(SecretLinkSerializer, 'HS256')
+        assert s2 is not s1
+        assert s2.secret_key == b'anothersecret'
+
+
+def test_email_confirmation_compat_validate_token(app, db):
+    """Test validation of email confirmation tokens for all algorithms."""
+    extra_data = dict(email="info@invenio-software.org")
+    with app.app_context():
+        for algorithm in ('HS256', 'HS512'):
+            t = EmailConfirmationSerializer(
+                algorithm_name=algorithm).create_token(1, extra_data)
+            data = EmailConfirmationSerializer.compat_validate_token(
+                t, expected_data=extra_data)
+            assert data['id'] == 1
+        assert EmailConfirmationSerializer.compat_validate_token(
+            'invalid') is None
+
+
+def test_load_header(app, db):
+    """Test loading of the unverified token header."""
+    with app.app_context():
+        t = SecretLinkSerializer(algorithm_name='HS256').create_token(
+            1, dict(recid=1))
+        assert load_header(t) == dict(alg='HS256')
+
+        t = TimedSecretLinkSerializer(
+            expires_at=datetime.utcnow()+timedelta(days=1)).create_token(
+                1, dict(recid=1))
+        header = load_header(t)
+        assert header['alg'] == 'HS512'
+        assert 'exp' in header and 'iat' in header
+
+        for t in ('', 'invalid', 'a.b.c', b'\xff.a.b'):
+            with pytest.raises(BadHeader):
+                load_header(t)
+
+        t = JSONWebSignatureSerializer(
+            'mysecret', algorithm_name='HS384').dumps(dict(id=1))
+        with pytest.raises(BadHeader):
+            load_header(t)
+
+
+def test_secretlink_factory_dispatch(app, db):
+    """Test validation of tokens for all algorithms and serializers."""
+    extra_data = dict(recid='1')
+    d = datetime.utcnow()+timedelta(days=1)
+    with app.app_context():
+        for algorithm in ('HS256', 'HS512'):
+            for s in (SecretLinkSerializer(algorithm_name=algorithm),
+                      TimedSecretLinkSerializer(
+                          expires_at=d, algorithm_name=algorithm)):
+                t = s.create_token(1, extra_data)
+                assert SecretLinkFactory.validate_token(
+                    t, expected_data=extra_data)['id'] == 1
+                assert SecretLinkFactory.load_token(t)['id'] == 1
+
+        for t in ('invalid', 'a.b.c'):
+            assert SecretLinkFactory.validate_token(t) is None
+            assert SecretLinkFactory.load_token(t) is None
+
+        # Header of a timed token with payload of a non-timed token.
+        t1 = TimedSecretLinkSerializer(expires_at=d).create_token(1, {})
+        t2 = SecretLinkSerializer().create_token(1, {})
+        t = b'.'.join([t1.split(b'.')[0]] + t2.split(b'.')[1:])
+        assert SecretLinkFactory.validate_token(t) is None
+
+
+def test_compact_serializer_create_validate(app, db):
+    """Test compact token creation."""
+    with app.app_context():
+        s = CompactSecretLinkSerializer()
+        t = s.create_token(1234, dict(recid=56789))
+        assert b'.' not in t
+        assert len(t) < len(SecretLinkSerializer().create_token(
+            1234, dict(recid=56789)))
+        data = s.validate_token(t, expected_data=dict(recid=56789))
+        assert data == dict(id=1234, data=dict(recid=56789))
+        assert s.validate_token(t, expected_data=dict(recid=1)) is None
+        assert s.create_token(1234, dict(recid=56789)) != t
+
+
+def test_compact_serializer_expired(app, db):
+    """Test compact token expiry."""
+    with app.app_context():
+        s = CompactSecretLinkSerializer(
+            expires_at=datetime.utcnow()+timedelta(days=1))
+        t = s.create_token(1, dict(recid=1))
+        assert s.validate_token(t)['id'] == 1
+
+        s = CompactSecretLinkSerializer(
+            expires_at=datetime.utcnow()-timedelta(seconds=20))
+        t = s.create_token(1, dict(recid=1))
+        assert s.validate_token(t) is None
+        with pytest.raises(SignatureExpired):
+            s.load_token(t)
+        assert s.load_token(t, force=True)['id'] == 1
+
+
+def test_compact_serializer_tampering(app, db):
+    """Test that modified compact tokens are rejected."""
+    with app.app_context():
+        s = CompactSecretLinkSerializer()
+        t = s.create_token(1, dict(recid=1))
+        modified = t[:-2] + (b'B' if t[-2:-1] == b'A' else b'A') + t[-1:]
+        for invalid in (t[:-1], modified, b'', b'invalid', t + t):
+            assert s.validate_token(invalid) is None
+
+        app.config['SECRET_KEY'] = 'anothersecret'
+        assert CompactSecretLinkSerializer().validate_token(t) is None
+
+
+def test_compact_serializer_supports():
+    """Test which data can be stored in compact tokens."""
+    assert CompactSecretLinkSerializer.supports(dict(recid=1))
+    assert not CompactSecretLinkSerializer.supports(dict(recid='1'))
+    assert not CompactSecretLinkSerializer.supports(dict(recid=-1))
+    assert not CompactSecretLinkSerializer.supports(dict(recid=True))
+    assert not CompactSecretLinkSerializer.supports(dict(recid=1, a=1))
+    assert not CompactSecretLinkSerializer.supports(None)
+
+
+def test_secretlink_factory_compact(app, db):
+    """Test creation and validation of compact tokens with the factory."""
+    with app.app_context():
+        app.config['ACCESSREQUESTS_SECRET_LINK_VERSION'] = 2
+        t = SecretLinkFactory.create_token(1, dict(recid=1))
+        assert b'.' not in t
+        assert SecretLinkFactory.validate_token(
+            t, expected_data=dict(recid=1))['id'] == 1
+
+        t = SecretLinkFactory.create_token(
+            1, dict(recid=1), expires_at=datetime.utcnow()-timedelta(days=1))
+        with pytest.raises(SignatureExpired):
+            SecretLinkFactory.load_token(t)
+        assert SecretLinkFactory.load_token(t, force=True)['id'] == 1
+
+        # Data not supported by compact tokens.
+        t = SecretLinkFactory.create_token(1, dict(recid='1'))
+        assert b'.' in t
+        assert SecretLinkFactory.validate_token(t)['data'] == dict(recid='1')
+
+
+def test_secret_key_rotation(app, db):
+    """Test signing and validation of tokens with a keyring."""
+    extra_data = dict(recid=1)
+    d = datetime.utcnow()+timedelta(days=1)
+    with app.app_context():
+        legacy = [
+            SecretLinkFactory.create_token(1, extra_data),
+            SecretLinkFactory.create_token(1, extra_data, expires_at=d),
+        ]
+        app.config['ACCESSREQUESTS_SECRET_KEYS'] = dict(k1='key1', k2='key2')
+        app.config['ACCESSREQUESTS_SECRET_KEY_ID'] = 'k1'
+        tokens = legacy + [
+            SecretLinkFactory.create_token(1, extra_data),
+            SecretLinkFactory.create_token(1, extra_data, expires_at=d),
+        ]
+        assert load_header(tokens[2]) == dict(alg='HS512', kid='k1')
+        assert load_header(tokens[3])['kid'] == 'k1'
+
+        app.config['ACCESSREQUESTS_SECRET_LINK_VERSION'] = 2
+        tokens.append(SecretLinkFactory.create_token(1, extra_data))
+        assert CompactSecretLinkSerializer.load_key_id(tokens[-1]) == 'k1'
+
+        # Rotate to a new key, tokens of all keys remain valid.
+        app.config['ACCESSREQUESTS_SECRET_KEY_ID'] = 'k2'
+        tokens.append(SecretLinkFactory.create_token(1, extra_data))
+        assert CompactSecretLinkSerializer.load_key_id(tokens[-1]) == 'k2'
+        for t in tokens:
+            assert SecretLinkFactory.validate_token(
+                t, expected_data=extra_data)['id'] == 1
+
+        # Remove the old key from the keyring.
+        del app.config['ACCESSREQUESTS_SECRET_KEYS']['k1']
+        assert SecretLinkFactory.validate_token(tokens[0])['id'] == 1
+        for t in tokens[2:5]:
+            assert SecretLinkFactory.validate_token(t) is None
+            with pytest.raises(BadHeader):
+                SecretLinkFactory.get_serializer(t)
+        assert SecretLinkFactory.validate_token(tokens[5])['id'] == 1
+
+
+def test_secret_key_rotation_email_confirmation(app, db):
+    """Test email confirmation tokens signed with a keyring."""
+    extra_data = dict(email="info@invenio-software.org")
+    with app.app_context():
+        app.config['ACCESSREQUESTS_SECRET_KEYS'] = dict(k1='key1')
+        t = EmailConfirmationSerializer(key_id='k1').create_token(
+            1, extra_data)
+        assert load_header(t)['kid'] == 'k1'
+        assert EmailConfirmationSerializer.compat_validate_token(
+            t, expected_data=extra_data)['id'] == 1
+        # Key id does not match the signing key.
+        assert EmailConfirmationSerializer().validate_token(t) is None
+
+        # Unknown and invalid key ids are rejected.
+        for kid in ('k2', ['k1']):
+            t = JSONWebSignatureSerializer('key1').dumps(
+                dict(id=1), header_fields=dict(kid=kid))
+            with pytest.raises(BadHeader):
+                load_header(t)
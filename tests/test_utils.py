@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""Utils tests."""
+
+from __future__ import absolute_import, print_function
+
+import uuid
+
+import pytest
+from flask import url_for
+from helpers import count_queries
+from invenio_pidstore.errors import PIDDoesNotExistError
+from invenio_records.api import Record
+from mock import patch
+from sqlalchemy.orm.exc import NoResultFound
+
+from zenodo_accessrequests.proxies import current_zenodo_accessrequests
+from zenodo_accessrequests.utils import RecordFields, get_record, \
+    get_record_fields, get_record_metadata, get_record_owners, get_records, \
+    get_records_metadata, resolver
+
+
+def test_get_record(app, db, record_example):
+    """Test memoization of records in the request context."""
+    pid_value, record = record_example
+
+    with app.test_request_context():
+        with patch.object(resolver, 'resolve',
+                          wraps=resolver.resolve) as resolve:
+            pid, r = get_record(pid_value)
+            assert r['title'] == record['title']
+            assert get_record(int(pid_value)) == (pid, r)
+            assert resolve.call_count == 1
+
+            # Missing records are memoized too.
+            for i in range(2):
+                with pytest.raises(PIDDoesNotExistError):
+                    get_record('2')
+            assert resolve.call_count == 2
+
+
+def test_get_records(app, db, record_example):
+    """Test batch lookup of records."""
+    pid_value, record = record_example
+    with app.test_request_context():
+        with count_queries() as statements:
+            records = get_records([1, 2, 1])
+        # PIDs, records and the missing PID
+        assert len(statements) == 3
+        assert list(records) == [1]
+        assert records[1][1]['title'] == record['title']
+
+        # Records are memoized.
+        with patch.object(resolver, 'resolve') as resolve:
+            assert get_record(1) == records[1]
+            assert get_records(['1', '2']) == {'1': records[1]}
+            assert not resolve.called
+
+
+def test_get_record_metadata_memo(app, db, record_example):
+    """Test memoization of record fields in the request context."""
+    pid_value, record = record_example
+    current_zenodo_accessrequests.record_cache.ttl = 0
+
+    with app.test_request_context():
+        with count_queries() as statements:
+            data = get_record_metadata(pid_value)
+            assert get_record_metadata(int(pid_value)) == data
+            assert get_records_metadata([1, 2]) == {1: data}
+        # The fields and the missing record
+        assert len(statements) == 2
+
+        # Missing records are memoized with their errors.
+        with patch.object(resolver, 'resolve',
+                          wraps=resolver.resolve) as resolve:
+            for i in range(2):
+                with pytest.raises(PIDDoesNotExistError):
+                    get_record_metadata(2)
+            assert resolve.call_count == 1
+
+        # Updating the record removes it from the memo.
+        pid, r = get_record(pid_value)
+        r['title'] = 'Updated'
+        r.commit()
+        assert get_record_metadata(pid_value)['title'] == 'Updated'
+
+
+def test_get_record_metadata(app, db, record_example):
+    """Test caching of record fields."""
+    pid_value, record = record_example
+
+    with app.test_request_context():
+        data = get_record_metadata(pid_value)
+        assert data['title'] == record['title']
+        assert 'description' not in data
+
+    with app.test_request_context():
+        with patch.object(resolver, 'resolve') as resolve:
+            assert get_record_metadata(pid_value) == data
+            assert get_records_metadata([1, '1']) == {1: data, '1': data}
+            assert not resolve.called
+
+        # Updating the record invalidates the cache.
+        pid, r = get_record(pid_value)
+        r['title'] = 'Updated'
+        r.commit()
+        assert get_record_metadata(pid_value)['title'] == 'Updated'
+
+        # Fields cached before the commit are invalidated again.
+        current_zenodo_accessrequests.record_cache.set(pid_value, record)
+        db.session.commit()
+        assert current_zenodo_accessrequests.record_cache.get(
+            pid_value) is None
+        assert get_record_metadata(pid_value)['title'] == 'Updated'
+
+        # Missing records raise the errors of the resolver.
+        with pytest.raises(PIDDoesNotExistError):
+            get_record_metadata('2')
+
+
+def test_record_fields(app, db, record_example):
+    """Test loading of record fields."""
+    pid_value, record = record_example
+
+    with app.test_request_context():
+        pid, r = get_record(pid_value)
+        fields = RecordFields.get_record(r.id)
+        assert fields.id == r.id
+        assert dict(fields) == dict(
+            title='Registered', owners=record['owners'],
+            access_right='restricted', access_conditions='fuu')
+        assert fields.get('description') is None
+        with pytest.raises(TypeError):
+            fields['title'] = 'Changed'
+        with pytest.raises(NoResultFound):
+            RecordFields.get_record(uuid.uuid4())
+
+        with count_queries() as statements:
+            records = get_record_fields([1, '2'])
+        assert len(statements) == 1
+        assert list(records) == ['1']
+        assert records['1']['title'] == 'Registered'
+
+        # Fields are cached by UUID until the record is updated.
+        with count_queries() as statements:
+            assert RecordFields.get_record(r.id) == fields
+        assert not statements
+        r['title'] = 'Updated'
+        r.commit()
+        assert RecordFields.get_record(r.id)['title'] == 'Updated'
+        db.session.commit()
+        assert RecordFields.get_record(r.id)['title'] == 'Updated'
+
+
+def test_access_request_record_fields(app, db, record_example):
+    """Test that the access request form only loads the record fields."""
+    pid_value, record = record_example
+
+    with app.test_client() as client:
+        with patch.object(Record, 'get_record') as get:
+            res = client.get(url_for(
+                'invenio_records_ui.recid_access_request',
+                pid_value=pid_value))
+            assert res.status_code == 200
+            assert b'Registered' in res.data
+            assert not get.called
+
+            # The fields are cached for the next requests.
+            with count_queries() as statements:
+                res = client.get(url_for(
+                    'invenio_records_ui.recid_access_request',
+                    pid_value=pid_value))
+            assert res.status_code == 200
+            assert not [s for s in statements if 'records_metadata' in s]
+
+
+def test_get_record_owners(app, db, users):
+    """Test bulk lookup of record owners."""
+    receiver_id, sender_id = users['receiver']['id'], users['sender']['id']
+
+    with app.test_request_context():
+        db.session.expunge_all()
+        with count_queries() as statements:
+            owners = get_record_owners(
+                [receiver_id, 999, sender_id, receiver_id])
+        assert len(statements) == 1
+        # Deleted accounts and duplicates are skipped.
+        assert [u.id for u in owners] == [receiver_id, sender_id]
+
+        assert get_record_owners([]) == []
+        assert [u.id for u in get_record_owners([str(sender_id)])] == \
+            [sender_id]
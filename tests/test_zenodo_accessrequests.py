@@ -27,11 +27,18 @@
 
 from __future__ import absolute_import, print_function
 
-from flask import Flask, session, url_for
+import json
+from datetime import datetime, timedelta
+
+from flask import Flask, current_app, session, url_for
+from invenio_access.models import ActionUsers
+from invenio_accounts.testutils import login_user_via_session
 from mock import patch
 
-from zenodo_accessrequests import ZenodoAccessRequests
+from zenodo_accessrequests import ZenodoAccessRequests, \
+    ZenodoAccessRequestsREST
 from zenodo_accessrequests.models import SecretLink
+from zenodo_accessrequests.permissions import introspect_tokens_action
 
 
 def test_version():
@@ -51,6 +58,12 @@ def test_init():
     assert 'zenodo-accessrequests' not in app.extensions
     ext.init_app(app)
     assert 'zenodo-accessrequests' in app.extensions
+    assert app.before_request_funcs[None]
+
+    app = Flask('testapp')
+    ext = ZenodoAccessRequestsREST(app)
+    assert 'zenodo-accessrequests' in app.extensions
+    assert not app.before_request_funcs
 
 
 def test_view(app, db, users, record_example):
@@ -70,3 +83,76 @@ def test_token_are_saved_in_session(app, db, users, record_example):
                           'validate_token', return_value=True):
             client.get("/", query_string=dict(token='123'))
             assert session['accessrequests-secret-token'] == '123'
+
+
+def test_token_introspection(app, db, users):
+    """Test batch validation of tokens."""
+    with app.test_request_context():
+        datastore = current_app.extensions['security'].datastore
+        receiver = datastore.get_user(users['receiver']['id'])
+        expires_at = datetime.utcnow() + timedelta(days=1)
+        links = [
+            SecretLink.create("Link", receiver, dict(recid=1)),
+            SecretLink.create("Link", receiver, dict(recid=1),
+                              expires_at=expires_at),
+            SecretLink.create("Link", receiver, dict(recid=2)),
+        ]
+        links[2].revoke()
+        db.session.commit()
+        tokens = [l.token for l in links]
+        ids = [l.id for l in links]
+        url = url_for('zenodo_accessrequests_api.introspect')
+        body = json.dumps([dict(token=tokens[0], recid=1)])
+
+    with app.test_client() as client:
+        res = client.post(url, content_type='application/json', data=body)
+        assert res.status_code == 401
+        login_user_via_session(client, email='sender@myemail.it')
+        res = client.post(url, content_type='application/json', data=body)
+        assert res.status_code == 403
+
+    with app.app_context():
+        db.session.add(ActionUsers.allow(
+            introspect_tokens_action, user_id=users['receiver']['id']))
+        db.session.commit()
+
+    with app.test_client() as client:
+        login_user_via_session(client, email='receiver@myemail.it')
+        res = client.post(url, content_type='application/json',
+                          data=json.dumps([
+                              dict(token=tokens[0], recid=1),
+                              dict(token=tokens[1], recid=1),
+                              dict(token=tokens[2], recid=2),
+                              dict(token=tokens[0], recid=2),
+                              dict(token='invalid', recid=1),
+                              dict(token=tokens[0], recid='1'),
+                          ]))
+        assert res.status_code == 200
+        data = json.loads(res.get_data(as_text=True))
+        assert data[0] == dict(valid=True, link_id=ids[0],
+                               expires_at=None)
+        assert data[1] == dict(valid=True, link_id=ids[1],
+                               expires_at=expires_at.replace(
+                                   hour=0, minute=0, second=0,
+                                   microsecond=0).isoformat())
+        assert data[2] == dict(valid=False, link_id=ids[2],
+                               expires_at=None)
+        assert data[3]['valid'] is False
+        assert data[4]['valid'] is False
+        assert data[5] == data[0]
+        assert res.cache_control.private
+        assert 0 < res.cache_control.max_age <= 60
+
+        res = client.post(url, content_type='application/json',
+                          data=json.dumps([dict(token=tokens[0])]))
+        assert res.status_code == 400
+        res = client.post(url, content_type='application/json',
+                          data=json.dumps([dict(token=123, recid=1)]))
+        assert res.status_code == 400
+        res = client.post(url, content_type='application/json',
+                          data=json.dumps([dict(token=tokens[0], recid=[1])]))
+        assert res.status_code == 400
+        res = client.post(url, content_type='application/json',
+                          data=json.dumps([dict(token=tokens[0], recid=1)] *
+                                          101))
+        assert res.status_code == 400
@@ -24,7 +24,7 @@
 
 from __future__ import absolute_import, print_function
 
-from .ext import ZenodoAccessRequests
+from .ext import ZenodoAccessRequests, ZenodoAccessRequestsREST
 from .proxies import current_zenodo_accessrequests
 from .version import __version__
 
@@ -32,4 +32,5 @@ __all__ = (
     '__version__',
     'current_zenodo_accessrequests',
     'ZenodoAccessRequests',
+    'ZenodoAccessRequestsREST',
 )
@@ -26,9 +26,23 @@
 from __future__ import absolute_import, print_function
 
 from flask_admin.contrib.sqla import ModelView
+from flask_admin.contrib.sqla.filters import BaseSQLAFilter
 from flask_babelex import gettext as _
 
 from .models import AccessRequest, SecretLink
+from .tokens import token_digest
+
+
+class TokenFilter(BaseSQLAFilter):
+    """Filter secret links by their token."""
+
+    def apply(self, query, value, alias=None):
+        """Filter by the digest of the token."""
+        return query.filter(self.column == token_digest(value.strip()))
+
+    def operation(self):
+        """Filter operation name."""
+        return _('equals')
 
 
 class AccessRequestAdmin(ModelView):
@@ -59,6 +73,12 @@ class SecretLinkAdmin(ModelView):
         'recid', 'owner', 'created', 'expires_at', 'revoked_at', 'title'
     )
 
+    column_filters = (
+        TokenFilter(SecretLink.token_digest, _('Token')),
+    )
+
+    form_excluded_columns = ('token_digest', )
+
 
 accessrequest_adminview = dict(
     modelview=AccessRequestAdmin,
@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Add counters of pending access requests."""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '11e9db473f14'
+down_revision = 'aeaa2716787f'
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'accessrequests_pending_count',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['user_id'], [u'accounts_user.id'],
+            name=op.f(
+                'fk_accessrequests_pending_count_user_id_accounts_user')),
+        sa.PrimaryKeyConstraint(
+            'user_id', name=op.f('pk_accessrequests_pending_count'))
+    )
+    op.execute(
+        "INSERT INTO accessrequests_pending_count (user_id, count) "
+        "SELECT receiver_user_id, COUNT(id) FROM accessrequests_request "
+        "WHERE status = 'P' GROUP BY receiver_user_id"
+    )
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_table('accessrequests_pending_count')
@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Add modification timestamp of secret links."""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '55b538e85417'
+down_revision = '11e9db473f14'
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.add_column('accessrequests_link',
+                  sa.Column('modified', sa.DateTime(), nullable=True))
+    op.execute(
+        "UPDATE accessrequests_link "
+        "SET modified = COALESCE(revoked_at, created)"
+    )
+    with op.batch_alter_table('accessrequests_link') as batch_op:
+        batch_op.alter_column('modified', existing_type=sa.DateTime(),
+                              nullable=False)
+        batch_op.create_index(op.f('ix_accessrequests_link_modified'),
+                              ['modified'], unique=False)
+
+
+def downgrade():
+    """Downgrade database."""
+    with op.batch_alter_table('accessrequests_link') as batch_op:
+        batch_op.drop_index(op.f('ix_accessrequests_link_modified'))
+        batch_op.drop_column('modified')
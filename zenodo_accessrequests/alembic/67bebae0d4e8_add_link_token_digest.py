@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Add token digest column to secret links."""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '67bebae0d4e8'
+down_revision = 'b58157cacf0e'
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    with op.batch_alter_table('accessrequests_link') as batch_op:
+        batch_op.add_column(
+            sa.Column('token_digest', sa.String(length=64), nullable=True))
+        batch_op.create_index(op.f('ix_accessrequests_link_token_digest'),
+                              ['token_digest'], unique=True)
+
+
+def downgrade():
+    """Downgrade database."""
+    with op.batch_alter_table('accessrequests_link') as batch_op:
+        batch_op.drop_index(op.f('ix_accessrequests_link_token_digest'))
+        batch_op.drop_column('token_digest')
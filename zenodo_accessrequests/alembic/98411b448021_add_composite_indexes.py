@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Add composite indexes matching the list queries."""
+
+import sqlalchemy as sa
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '98411b448021'
+down_revision = 'f938cdc7d3ab'
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_index('ix_accessrequests_link_owner_revoked_at_created',
+                    'accessrequests_link',
+                    ['owner_user_id', 'revoked_at', 'created'], unique=False)
+    op.create_index('ix_accessrequests_link_owner_revoked_at_title',
+                    'accessrequests_link',
+                    ['owner_user_id', 'revoked_at', 'title'], unique=False)
+    op.create_index('ix_accessrequests_link_owner_revoked_at_expires_at',
+                    'accessrequests_link',
+                    ['owner_user_id', 'revoked_at', 'expires_at'],
+                    unique=False)
+    # Prefix of ix_accessrequests_link_revoked_at_expires_at
+    op.drop_index(op.f('ix_accessrequests_link_revoked_at'),
+                  table_name='accessrequests_link')
+
+    op.create_index('ix_accessrequests_request_receiver_status_created',
+                    'accessrequests_request',
+                    ['receiver_user_id', 'status', 'created'], unique=False)
+    op.create_index(op.f('ix_accessrequests_request_sender_user_id'),
+                    'accessrequests_request', ['sender_user_id'],
+                    unique=False)
+    op.create_index(op.f('ix_accessrequests_request_link_id'),
+                    'accessrequests_request', ['link_id'], unique=False)
+    # Status is only queried together with the receiver
+    op.drop_index(op.f('ix_accessrequests_request_status'),
+                  table_name='accessrequests_request')
+
+
+def downgrade():
+    """Downgrade database."""
+    op.create_index(op.f('ix_accessrequests_request_status'),
+                    'accessrequests_request', ['status'], unique=False)
+    op.drop_index(op.f('ix_accessrequests_request_link_id'),
+                  table_name='accessrequests_request')
+    op.drop_index(op.f('ix_accessrequests_request_sender_user_id'),
+                  table_name='accessrequests_request')
+    op.drop_index('ix_accessrequests_request_receiver_status_created',
+                  table_name='accessrequests_request')
+
+    op.create_index(op.f('ix_accessrequests_link_revoked_at'),
+                    'accessrequests_link', ['revoked_at'], unique=False)
+    op.drop_index('ix_accessrequests_link_owner_revoked_at_expires_at',
+                  table_name='accessrequests_link')
+    op.drop_index('ix_accessrequests_link_owner_revoked_at_title',
+                  table_name='accessrequests_link')
+    op.drop_index('ix_accessrequests_link_owner_revoked_at_created',
+                  table_name='accessrequests_link')
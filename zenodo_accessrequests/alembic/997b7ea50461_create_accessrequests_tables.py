@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Create accessrequests tables."""
+
+import sqlalchemy as sa
+import sqlalchemy_utils
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '997b7ea50461'
+down_revision = '2b5a196c761d'
+branch_labels = ()
+depends_on = '9848d0149abd'
+
+
+def upgrade():
+    """Upgrade database."""
+    op.create_table(
+        'accessrequests_link',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('token', sqlalchemy_utils.types.encrypted.encrypted_type.
+                  EncryptedType(), nullable=False),
+        sa.Column('owner_user_id', sa.Integer(), nullable=False),
+        sa.Column('created', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.Column('revoked_at', sa.DateTime(), nullable=True),
+        sa.Column('title', sa.String(length=255), nullable=False),
+        sa.Column('description', sa.Text(), nullable=False),
+        sa.ForeignKeyConstraint(
+            ['owner_user_id'], [u'accounts_user.id'],
+            name=op.f('fk_accessrequests_link_owner_user_id_accounts_user')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_accessrequests_link'))
+    )
+    op.create_index(op.f('ix_accessrequests_link_created'),
+                    'accessrequests_link', ['created'], unique=False)
+    op.create_index(op.f('ix_accessrequests_link_revoked_at'),
+                    'accessrequests_link', ['revoked_at'], unique=False)
+    op.create_table(
+        'accessrequests_request',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.CHAR(length=1), nullable=False),
+        sa.Column('receiver_user_id', sa.Integer(), nullable=False),
+        sa.Column('sender_user_id', sa.Integer(), nullable=True),
+        sa.Column('sender_full_name', sa.String(length=255), nullable=False),
+        sa.Column('sender_email', sa.String(length=255), nullable=False),
+        sa.Column('recid', sa.Integer(), nullable=False),
+        sa.Column('created', sa.DateTime(), nullable=False),
+        sa.Column('modified', sa.DateTime(), nullable=False),
+        sa.Column('justification', sa.Text(), nullable=False),
+        sa.Column('message', sa.Text(), nullable=False),
+        sa.Column('link_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(
+            ['link_id'], [u'accessrequests_link.id'],
+            name=op.f(
+                'fk_accessrequests_request_link_id_accessrequests_link')),
+        sa.ForeignKeyConstraint(
+            ['receiver_user_id'], [u'accounts_user.id'],
+            name=op.f(
+                'fk_accessrequests_request_receiver_user_id_accounts_user')),
+        sa.ForeignKeyConstraint(
+            ['sender_user_id'], [u'accounts_user.id'],
+            name=op.f(
+                'fk_accessrequests_request_sender_user_id_accounts_user')),
+        sa.PrimaryKeyConstraint('id', name=op.f('pk_accessrequests_request'))
+    )
+    op.create_index(op.f('ix_accessrequests_request_created'),
+                    'accessrequests_request', ['created'], unique=False)
+    op.create_index(op.f('ix_accessrequests_request_recid'),
+                    'accessrequests_request', ['recid'], unique=False)
+    op.create_index(op.f('ix_accessrequests_request_status'),
+                    'accessrequests_request', ['status'], unique=False)
+
+
+def downgrade():
+    """Downgrade database."""
+    op.drop_index(op.f('ix_accessrequests_request_status'),
+                  table_name='accessrequests_request')
+    op.drop_index(op.f('ix_accessrequests_request_recid'),
+                  table_name='accessrequests_request')
+    op.drop_index(op.f('ix_accessrequests_request_created'),
+                  table_name='accessrequests_request')
+    op.drop_table('accessrequests_request')
+    op.drop_index(op.f('ix_accessrequests_link_revoked_at'),
+                  table_name='accessrequests_link')
+    op.drop_index(op.f('ix_accessrequests_link_created'),
+                  table_name='accessrequests_link')
+    op.drop_table('accessrequests_link')
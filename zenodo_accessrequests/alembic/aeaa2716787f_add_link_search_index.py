@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Add full-text search index of secret links."""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'aeaa2716787f'
+down_revision = '98411b448021'
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(
+            "CREATE INDEX ix_accessrequests_link_fts ON accessrequests_link "
+            "USING gin (to_tsvector('simple', title || ' ' || description))"
+        )
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE accessrequests_link_fts "
+            "USING fts5(title, description)"
+        )
+        op.execute(
+            "INSERT INTO accessrequests_link_fts (rowid, title, description) "
+            "SELECT id, title, description FROM accessrequests_link "
+            "WHERE revoked_at IS NULL"
+        )
+
+
+def downgrade():
+    """Downgrade database."""
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.drop_index('ix_accessrequests_link_fts',
+                      table_name='accessrequests_link')
+    elif dialect == 'sqlite':
+        op.execute("DROP TABLE accessrequests_link_fts")
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Add record id and extra data columns to secret links."""
+
+import sqlalchemy as sa
+import sqlalchemy_utils
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = 'b58157cacf0e'
+down_revision = '997b7ea50461'
+branch_labels = ()
+depends_on = None
+
+
+def upgrade():
+    """Upgrade database."""
+    with op.batch_alter_table('accessrequests_link') as batch_op:
+        batch_op.add_column(sa.Column('recid', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column(
+            'extra_data', sqlalchemy_utils.types.json.JSONType(),
+            nullable=True))
+        batch_op.create_index(op.f('ix_accessrequests_link_recid'),
+                              ['recid'], unique=False)
+
+
+def downgrade():
+    """Downgrade database."""
+    with op.batch_alter_table('accessrequests_link') as batch_op:
+        batch_op.drop_index(op.f('ix_accessrequests_link_recid'))
+        batch_op.drop_column('extra_data')
+        batch_op.drop_column('recid')
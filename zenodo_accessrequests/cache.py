@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Process-local cache of verified secret link tokens."""
+
+from __future__ import absolute_import, print_function
+
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from itsdangerous import want_bytes
+
+
+class TokenCache(object):
+    """LRU cache of verified secret link tokens with a time-to-live.
+
+    Entries are keyed by a digest of the token and hold the link id, the
+    decoded token payload and the time at which the entry expires. An entry
+    never outlives the expiration date of its link.
+    """
+
+    def __init__(self, maxsize=1000, ttl=60):
+        """Initialize cache.
+
+        :param maxsize: Maximum number of cached tokens.
+        :param ttl: Number of seconds a token is cached. ``0`` disables the
+            cache.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._links = {}
+
+    @staticmethod
+    def key(token):
+        """Compute cache key for a token."""
+        return hashlib.sha256(want_bytes(token)).hexdigest()
+
+    def get(self, token):
+        """Get the payload of a cached token.
+
+        :returns: The decoded token payload or ``None`` if the token is not
+            cached or the entry has expired.
+        """
+        if self.ttl <= 0:
+            return None
+        key = self.key(token)
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            link_id, data, expires = entry
+            if datetime.utcnow() >= expires:
+                self._discard(key, link_id)
+                return None
+            # Re-insert to mark the entry as most recently used.
+            self._entries[key] = entry
+            return data
+
+    def set(self, token, link_id, data, expires_at=None):
+        """Cache a verified token.
+
+        :param token: Token value.
+        :param link_id: Id of the secret link the token belongs to.
+        :param data: Decoded token payload.
+        :param expires_at: Expiration date of the link (if any).
+        """
+        if self.ttl <= 0:
+            return
+        expires = datetime.utcnow() + timedelta(seconds=self.ttl)
+        if expires_at is not None and expires_at < expires:
+            expires = expires_at
+
+        key = self.key(token)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._discard(key, old[0])
+            self._entries[key] = (link_id, data, expires)
+            self._links.setdefault(link_id, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                old_key, old = self._entries.popitem(last=False)
+                self._discard(old_key, old[0])
+
+    def evict_link(self, link_id):
+        """Remove all cached tokens of a secret link."""
+        self.evict_links([link_id])
+
+    def evict_links(self, link_ids):
+        """Remove all cached tokens of several secret links."""
+        with self._lock:
+            for link_id in link_ids:
+                for key in self._links.pop(link_id, ()):
+                    self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._links.clear()
+
+    def __len__(self):
+        """Get number of cached tokens."""
+        return len(self._entries)
+
+    def _discard(self, key, link_id):
+        """Remove key from the link index (lock must be held)."""
+        self._entries.pop(key, None)
+        keys = self._links.get(link_id)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._links[link_id]
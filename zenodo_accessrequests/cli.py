@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Command line interface for access requests."""
+
+from __future__ import absolute_import, print_function
+
+import time
+
+import click
+from flask.cli import with_appcontext
+from invenio_db import db
+
+from .models import PendingRequestCount, SecretLink
+from .proxies import current_zenodo_accessrequests
+from .search import reindex_links
+
+
+@click.group()
+def accessrequests():
+    """Access requests commands."""
+
+
+@accessrequests.command('rebuild-link-index')
+@with_appcontext
+def rebuild_link_index():
+    """Rebuild the shared index of secret link states."""
+    index = current_zenodo_accessrequests.link_index
+    if index is None:
+        raise click.UsageError('ACCESSREQUESTS_LINK_INDEX_PATH is not set.')
+    index.build()
+    click.secho('Secret link index rebuilt.', fg='green')
+
+
+@accessrequests.command('refresh-link-index')
+@with_appcontext
+def refresh_link_index():
+    """Update the shared index of secret link states.
+
+    The index is rebuilt if it is missing or stale. Meant to be run
+    periodically on each host, as the index is not built while serving
+    requests.
+    """
+    index = current_zenodo_accessrequests.link_index
+    if index is None:
+        raise click.UsageError('ACCESSREQUESTS_LINK_INDEX_PATH is not set.')
+    if not index.refresh():
+        raise click.ClickException('Secret link index is locked.')
+    click.secho('Secret link index refreshed.', fg='green')
+
+
+@accessrequests.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index():
+    """Rebuild the full-text search index of secret links.
+
+    Only needed on SQLite, e.g. after editing links outside of the
+    application, since PostgreSQL maintains its index itself.
+    """
+    reindex_links()
+    db.session.commit()
+    click.secho('Secret link search index rebuilt.', fg='green')
+
+
+@accessrequests.command('recompute-pending-counts')
+@with_appcontext
+def recompute_pending_counts():
+    """Recompute the numbers of pending access requests of all receivers."""
+    PendingRequestCount.recompute()
+    db.session.commit()
+    click.secho('Pending access request counts recomputed.', fg='green')
+
+
+@accessrequests.command('backfill-links')
+@click.option('--batch-size', default=1000, show_default=True,
+              help='Number of links updated per transaction.')
+@with_appcontext
+def backfill_links(batch_size):
+    """Store record ids, extra data and token digests of secret links.
+
+    Only links without a token digest are selected. Links are processed in
+    batches ordered by id, and the digest is stored even for links whose
+    token cannot be loaded, so the command can be interrupted and run again
+    without processing the same links twice.
+    """
+    last_id = 0
+    updated = failed = 0
+    while True:
+        links = SecretLink.query.options(
+            db.undefer(SecretLink.token)
+        ).filter(
+            SecretLink.id > last_id,
+            SecretLink.token_digest.is_(None),
+        ).order_by(SecretLink.id).limit(batch_size).all()
+        if not links:
+            break
+        for link in links:
+            if link.backfill():
+                updated += 1
+            else:
+                failed += 1
+        last_id = links[-1].id
+        db.session.commit()
+    click.secho('{0} links updated.'.format(updated), fg='green')
+    if failed:
+        click.secho('{0} links with invalid tokens.'.format(failed),
+                    fg='yellow')
+
+
+@accessrequests.command('sweep-expired-links')
+@click.option('--batch-size', default=500, show_default=True,
+              help='Number of links revoked per transaction.')
+@click.option('--pause', default=0.0, show_default=True,
+              help='Number of seconds to wait between batches.')
+@click.option('--max-batches', type=int,
+              help='Stop after a number of batches.')
+@with_appcontext
+def sweep_expired_links(batch_size, pause, max_batches):
+    """Revoke expired secret links.
+
+    Each batch is committed on its own, so the command can be interrupted
+    and run again.
+    """
+    revoked = batches = 0
+    while max_batches is None or batches < max_batches:
+        link_ids = SecretLink.revoke_expired(batch_size=batch_size)
+        db.session.commit()
+        revoked += len(link_ids)
+        batches += 1
+        if len(link_ids) < batch_size:
+            break
+        time.sleep(pause)
+    click.secho('{0} expired links revoked.'.format(revoked), fg='green')
@@ -27,17 +27,118 @@ from __future__ import absolute_import, print_function
 ACCESSREQUESTS_CONFIRMLINK_EXPIRES_IN = 5*24*60*60
 """Number of seconds after the email confirmation link expires."""
 
-ACCESSREQUESTS_RECORDS_UI_ENDPOINTS = dict(
-    recid_access_request=dict(
-        pid_type='recid',
-        route='/record/<pid_value>/accessrequest',
-        template='zenodo_accessrequests/access_request.html',
-        view_imp='zenodo_accessrequests.views.requests.access_request',
-        methods=['GET', 'POST'],
-    ),
-    recid_access_request_email_confirm=dict(
-        pid_type='recid',
-        route='/record/<pid_value>/accessrequest/<token>/confirm',
-        view_imp='zenodo_accessrequests.views.requests.confirm',
-    ),
-)
+ACCESSREQUESTS_SECRET_LINK_VERSION = 1
+"""Format of new secret link tokens.
+
+``1`` creates JSON Web Signature tokens, while ``2`` creates compact binary
+tokens for links to a single record. Tokens of both formats are always
+accepted, but only switch to ``2`` once every process validating tokens
+supports the compact format.
+"""
+
+ACCESSREQUESTS_SECRET_KEYS = {}
+"""Keyring of secret keys for signing tokens, indexed by short key ids.
+
+Tokens carry the id of their signing key, so that keys can be rotated while
+tokens signed with older keys in the keyring remain valid. Tokens without a
+key id are always validated with ``SECRET_KEY``.
+"""
+
+ACCESSREQUESTS_SECRET_KEY_ID = None
+"""Id of the key in ``ACCESSREQUESTS_SECRET_KEYS`` used to sign new tokens.
+
+``None`` signs new tokens with ``SECRET_KEY`` and without a key id.
+"""
+
+ACCESSREQUESTS_TOKEN_CACHE_TTL = 60
+"""Number of seconds a verified secret link token is cached in a process.
+
+A link revoked from another process may still be accepted by this process
+until the cached token expires. Set to ``0`` to disable the cache.
+"""
+
+ACCESSREQUESTS_TOKEN_CACHE_SIZE = 1000
+"""Maximum number of verified secret link tokens cached in a process."""
+
+ACCESSREQUESTS_RECORD_FIELDS = [
+    'title', 'doi', 'owners', 'access_right', 'access_conditions',
+    'embargo_date', 'collections',
+]
+"""Record fields loaded and cached for access request pages and emails."""
+
+ACCESSREQUESTS_RECORD_CACHE_TTL = 300
+"""Number of seconds the fields of a record are cached.
+
+Records are removed from the cache when they are updated or deleted. A
+process-local cache is however only updated for changes made by the same
+process. Set to ``0`` to disable the cache.
+"""
+
+ACCESSREQUESTS_RECORD_CACHE_SIZE = 1000
+"""Maximum number of records in the process-local record cache."""
+
+ACCESSREQUESTS_RECORD_CACHE_BACKEND = None
+"""Factory of the record cache backend, or its import path.
+
+The factory is called with the application. ``None`` uses a process-local
+LRU cache. To share the cache between processes, e.g.:
+
+.. code-block:: python
+
+    def record_cache_backend(app):
+        return KVBackend(RedisStore(redis.StrictRedis.from_url(
+            app.config['CACHE_REDIS_URL'])))
+"""
+
+ACCESSREQUESTS_INTROSPECT_MAX_TOKENS = 100
+"""Maximum number of tokens checked in one token introspection request."""
+
+ACCESSREQUESTS_INTROSPECT_MAX_AGE = 60
+"""Maximum number of seconds a token introspection response may be cached."""
+
+ACCESSREQUESTS_LINKS_PER_PAGE = 20
+"""Default number of shared links per page in the user settings."""
+
+ACCESSREQUESTS_LINKS_MAX_PER_PAGE = 100
+"""Maximum number of shared links per page in the user settings."""
+
+ACCESSREQUESTS_SWEEP_BATCH_SIZE = 500
+"""Number of expired secret links revoked per transaction by the sweeper."""
+
+ACCESSREQUESTS_SWEEP_MAX_BATCHES = 20
+"""Number of batches after which the sweeper task schedules itself again."""
+
+ACCESSREQUESTS_SWEEP_COUNTDOWN = 10
+"""Number of seconds before the sweeper task continues with more batches.
+
+The sweeper task revokes expired links and is meant to be run periodically,
+e.g.:
+
+.. code-block:: python
+
+    CELERYBEAT_SCHEDULE = {
+        'accessrequests-sweep-expired-links': {
+            'task': 'zenodo_accessrequests.tasks.sweep_expired_links',
+            'schedule': timedelta(hours=1),
+        },
+    }
+"""
+
+ACCESSREQUESTS_LINK_INDEX_PATH = None
+"""Path of the memory-mapped index of secret link states.
+
+The index is shared by all processes on a host and lets token validation
+check revocation and expiry without querying the database. ``None`` disables
+the index.
+
+The index is not built while serving requests: run
+``flask accessrequests refresh-link-index`` periodically on each host (e.g.
+from cron), so that a missing or stale index is rebuilt.
+"""
+
+ACCESSREQUESTS_LINK_INDEX_REFRESH_INTERVAL = 60
+"""Number of seconds between updates of the secret link index."""
+
+ACCESSREQUESTS_LINK_INDEX_MAX_AGE = 300
+"""Number of seconds after which a secret link index which has not been
+updated is no longer used."""
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Shared encryption engines for encrypted columns and tokens."""
+
+from __future__ import absolute_import, print_function
+
+import copy
+import threading
+from base64 import urlsafe_b64encode
+
+from cryptography.fernet import Fernet
+from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives import hashes
+from itsdangerous import want_bytes
+from sqlalchemy_utils.types import EncryptedType
+
+
+class EngineCache(object):
+    """Thread-safe cache of encryption engines initialized with a key.
+
+    Initializing an engine derives the encryption key and sets up the cipher,
+    so engines are built once per kind of engine and key, and reused across
+    values and threads.
+    """
+
+    def __init__(self, maxsize=16):
+        """Initialize cache.
+
+        :param maxsize: Number of engines after which the cache is emptied,
+            as engines for old keys are never used again.
+        """
+        self.maxsize = maxsize
+        self._engines = {}
+        self._lock = threading.Lock()
+
+    def get(self, kind, key, factory):
+        """Get engine of a kind for a key.
+
+        :param kind: Hashable identifying the kind of engine.
+        :param key: The secret key.
+        :param factory: Function called with the key to build the engine.
+        """
+        engine = self._engines.get((kind, key))
+        if engine is None:
+            with self._lock:
+                engine = self._engines.get((kind, key))
+                if engine is None:
+                    if len(self._engines) >= self.maxsize:
+                        self._engines.clear()
+                    engine = factory(key)
+                    self._engines[(kind, key)] = engine
+        return engine
+
+    def clear(self):
+        """Remove all engines."""
+        with self._lock:
+            self._engines.clear()
+
+
+engines = EngineCache()
+"""Encryption engines of the process."""
+
+
+def _create_fernet(secret_key):
+    """Create a Fernet engine from the SHA256 digest of a secret key."""
+    digest = hashes.Hash(hashes.SHA256(), backend=default_backend())
+    digest.update(want_bytes(secret_key))
+    return Fernet(urlsafe_b64encode(digest.finalize()))
+
+
+def get_fernet(secret_key):
+    """Get the shared Fernet engine for a secret key."""
+    return engines.get(Fernet, secret_key, _create_fernet)
+
+
+class CachedEncryptedType(EncryptedType):
+    """Encrypted type using the shared engine for the current key.
+
+    ``EncryptedType`` initializes its single engine again for every value,
+    which is both slow and unsafe when threads use different keys. Instead,
+    the engine for the current key is taken from the shared cache and kept
+    per thread.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initialize type."""
+        self._local = threading.local()
+        super(CachedEncryptedType, self).__init__(*args, **kwargs)
+
+    @property
+    def engine(self):
+        """Engine for the key of the current thread."""
+        return getattr(self._local, 'engine', None) or self._engine
+
+    @engine.setter
+    def engine(self, value):
+        """Set engine used as template for the engines of each key."""
+        self._engine = value
+
+    def _update_key(self):
+        """Select the engine for the current key."""
+        key = self._key() if callable(self._key) else self._key
+        self._local.engine = engines.get(self._engine, key, self._create)
+
+    def _create(self, key):
+        """Create an engine for a key from the template engine."""
+        engine = copy.copy(self._engine)
+        engine._update_key(key)
+        return engine
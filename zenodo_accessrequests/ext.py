@@ -27,8 +27,13 @@
 from __future__ import absolute_import, print_function
 
 from flask import request, session
+from werkzeug.utils import import_string
 
 from . import config
+from .cache import TokenCache
+from .linkindex import LinkIndex
+from .recordcache import LRUBackend, RecordCache
+from .tokens import SerializerRegistry
 
 
 def verify_token():
@@ -50,6 +55,32 @@ class _AppState(object):
         """Initialize state."""
         from .receivers import connect_receivers
         self.app = app
+        self.serializers = SerializerRegistry()
+        self.token_cache = TokenCache(
+            maxsize=app.config['ACCESSREQUESTS_TOKEN_CACHE_SIZE'],
+            ttl=app.config['ACCESSREQUESTS_TOKEN_CACHE_TTL'],
+        )
+        backend = app.config['ACCESSREQUESTS_RECORD_CACHE_BACKEND']
+        if backend is None:
+            backend = LRUBackend(
+                maxsize=app.config['ACCESSREQUESTS_RECORD_CACHE_SIZE'])
+        else:
+            if not callable(backend):
+                backend = import_string(backend)
+            backend = backend(app)
+        self.record_cache = RecordCache(
+            backend,
+            app.config['ACCESSREQUESTS_RECORD_FIELDS'],
+            ttl=app.config['ACCESSREQUESTS_RECORD_CACHE_TTL'],
+        )
+        self.link_index = None
+        if app.config['ACCESSREQUESTS_LINK_INDEX_PATH']:
+            self.link_index = LinkIndex(
+                app.config['ACCESSREQUESTS_LINK_INDEX_PATH'],
+                refresh_interval=app.config[
+                    'ACCESSREQUESTS_LINK_INDEX_REFRESH_INTERVAL'],
+                max_age=app.config['ACCESSREQUESTS_LINK_INDEX_MAX_AGE'],
+            )
         connect_receivers()
 
 
@@ -82,3 +113,18 @@ class ZenodoAccessRequests(object):
         for k in dir(config):
             if k.startswith('ACCESSREQUESTS_'):
                 app.config.setdefault(k, getattr(config, k))
+
+
+class ZenodoAccessRequestsREST(ZenodoAccessRequests):
+    """Zenodo-AccessRequests REST API extension.
+
+    Unlike :class:`ZenodoAccessRequests`, secret link tokens passed in the
+    query string are not stored in the session, as REST API requests are
+    stateless.
+    """
+
+    def init_app(self, app):
+        """Flask application initialization."""
+        self.init_config(app)
+        state = _AppState(app=app)
+        app.extensions['zenodo-accessrequests'] = state
@@ -30,8 +30,8 @@ from datetime import datetime, timedelta
 from flask_babelex import gettext as _
 from flask_security.forms import email_required, email_validator
 from flask_wtf import Form
-from wtforms import DateField, HiddenField, StringField, SubmitField, \
-    TextAreaField, validators
+from wtforms import DateField, HiddenField, SelectMultipleField, StringField, \
+    SubmitField, TextAreaField, validators
 
 from .widgets import Button
 
@@ -131,3 +131,28 @@ class DeleteForm(Form):
     link = HiddenField()
 
     delete = SubmitField(_("Revoke"), widget=Button(icon="fa fa-trash-o"))
+
+
+class LinkIdsField(SelectMultipleField):
+    """Field for a list of secret link ids.
+
+    Ids are not restricted to a list of choices, so they must be checked
+    when the links are queried.
+    """
+
+    def __init__(self, *args, **kwargs):
+        """Initialize field."""
+        kwargs.setdefault('coerce', int)
+        super(LinkIdsField, self).__init__(*args, **kwargs)
+
+    def pre_validate(self, form):
+        """Do not validate ids against choices."""
+
+
+class RevokeLinksForm(Form):
+    """Form used for revoking several links."""
+
+    links = LinkIdsField()
+
+    revoke = SubmitField(_("Revoke selected"),
+                         widget=Button(icon="fa fa-trash-o"))
@@ -24,6 +24,11 @@
 
 from __future__ import absolute_import, print_function
 
+import json
+from datetime import datetime
+
+from itsdangerous import BadData, base64_decode, base64_encode
+from sqlalchemy import and_, or_
 from sqlalchemy.sql.expression import desc
 
 
@@ -92,3 +97,148 @@ class QueryOrdering(Ordering):
             elif self._selected and not self.asc:
                 return self.query.order_by(desc(self._selected))
         return self.query
+
+    def paginate(self, per_page, cursor=None, tiebreaker='id'):
+        """Get a page of the query using keyset pagination.
+
+        :param per_page: Number of items per page.
+        :param cursor: Cursor of the page as returned by
+            :class:`KeysetPagination`, or ``None`` for the first page.
+        :param tiebreaker: Name of a unique column used to order rows with
+            equal values in the selected column.
+        :returns: A :class:`KeysetPagination` instance.
+        """
+        model = self.query.column_descriptions[0]['entity']
+        return KeysetPagination(
+            self.query,
+            getattr(model, self._selected or tiebreaker),
+            getattr(model, tiebreaker),
+            per_page,
+            cursor=cursor,
+            asc=self.asc is not False,
+        )
+
+
+class KeysetPagination(object):
+    """Keyset pagination of an SQLAlchemy query.
+
+    Rows are ordered by a column and a unique tie-breaker column. Instead of
+    an offset, a page is addressed by an opaque cursor holding the values of
+    the row just before (or after) the page, so that every page costs the
+    same to fetch. NULL values are sorted last in ascending order.
+
+    Rows with NULL values are fetched as a partition of their own, so that
+    rows are only ordered by plain columns and seeked with range criteria,
+    which lets the database read them in the order of an index.
+    """
+
+    def __init__(self, query, column, tiebreaker, per_page, cursor=None,
+                 asc=True):
+        """Fetch the page of the query.
+
+        :param query: Unordered SQLAlchemy query.
+        :param column: Model attribute to order by.
+        :param tiebreaker: Model attribute of a unique column.
+        :param per_page: Number of items per page.
+        :param cursor: Cursor of the page or ``None`` for the first page.
+        :param asc: Order ascending if ``True``.
+        :raises ValueError: If the cursor is invalid.
+        """
+        self.column = column
+        self.tiebreaker = tiebreaker
+        self.per_page = per_page
+        self.asc = asc
+        self._nullable = column.property.columns[0].nullable
+
+        forward, key = self.load_cursor(cursor) if cursor else (True, None)
+        items = self._fetch(query, asc == forward, key, per_page + 1)
+
+        more = len(items) > per_page
+        self.items = items[:per_page]
+        if forward:
+            self.has_next, self.has_prev = more, key is not None
+        else:
+            self.items.reverse()
+            self.has_next, self.has_prev = key is not None, more
+
+    def _fetch(self, query, asc, key, limit):
+        """Get the rows following a key, with one query per partition."""
+        partitions = [False, True] if self._nullable else [False]
+        if not asc:
+            partitions.reverse()
+        if key is not None:
+            partitions = partitions[partitions.index(key[0] is None):]
+
+        items = []
+        for null in partitions:
+            partition = query
+            if self._nullable:
+                partition = partition.filter(
+                    self.column.is_(None) if null else self.column.isnot(None))
+            if key is not None:
+                partition = partition.filter(self._seek(asc, *key))
+                key = None
+            items.extend(partition.order_by(*self._order(asc, null)).limit(
+                limit - len(items)).all())
+            if len(items) >= limit:
+                break
+        return items
+
+    def _order(self, asc, null=False):
+        """Get the ORDER BY clauses of a partition."""
+        clauses = [self.tiebreaker] if null else [self.column, self.tiebreaker]
+        return clauses if asc else [desc(c) for c in clauses]
+
+    def _seek(self, asc, value, ident):
+        """Get the criterion selecting rows following the given key."""
+        col, tiebreaker = self.column, self.tiebreaker
+        if value is None:
+            return tiebreaker > ident if asc else tiebreaker < ident
+        if asc:
+            return and_(col >= value, or_(col > value, tiebreaker > ident))
+        return and_(col <= value, or_(col < value, tiebreaker < ident))
+
+    def dump_cursor(self, forward, item):
+        """Get the cursor of the page after (or before) an item."""
+        value = getattr(item, self.column.key)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        data = ['n' if forward else 'p', self.column.key, value,
+                getattr(item, self.tiebreaker.key)]
+        return base64_encode(
+            json.dumps(data, separators=(',', ':')).encode('utf-8')
+        ).decode('ascii')
+
+    def load_cursor(self, cursor):
+        """Get the direction and key from a cursor.
+
+        :raises ValueError: If the cursor is invalid.
+        """
+        try:
+            direction, name, value, ident = json.loads(
+                base64_decode(cursor).decode('utf-8'))
+            if direction not in ('n', 'p') or name != self.column.key or \
+                    not isinstance(ident, int):
+                raise ValueError('Invalid cursor.')
+            if value is not None and issubclass(
+                    self.column.type.python_type, datetime):
+                value = datetime.strptime(
+                    value, '%Y-%m-%dT%H:%M:%S.%f' if '.' in value
+                    else '%Y-%m-%dT%H:%M:%S')
+        except (BadData, TypeError, ValueError):
+            raise ValueError('Invalid cursor.')
+        return direction == 'n', (value, ident)
+
+    @property
+    def next_cursor(self):
+        """Get the cursor of the next page."""
+        if self.has_next and self.items:
+            return self.dump_cursor(True, self.items[-1])
+        return None
+
+    @property
+    def prev_cursor(self):
+        """Get the cursor of the previous page."""
+        if self.has_prev and self.items:
+            return self.dump_cursor(False, self.items[0])
+        return None
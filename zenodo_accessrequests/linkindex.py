@@ -0,0 +1,325 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Memory-mapped index of the revocation and expiry state of secret links.
+
+The index is a file shared by all worker processes on a host. It starts with
+a header followed by one fixed-size record per secret link, sorted by link
+id::
+
+    header: magic, number of records, sync timestamp, highest link id
+    record: link id, expiration timestamp (0 if none), revoked flag
+
+Lookups are binary searches in the mapped file and do not touch the
+database. Revocations committed in the current process are written directly
+into the shared mapping, while changes made elsewhere are picked up by a
+periodic delta query. A stale or missing index answers no lookups, so that
+callers fall back to the database, until it is rebuilt outside of requests.
+"""
+
+from __future__ import absolute_import, print_function
+
+import calendar
+import fcntl
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+from invenio_db import db
+from sqlalchemy.exc import SQLAlchemyError
+
+HEADER = struct.Struct('<8sqqq')
+"""Header layout: magic, count, sync timestamp and highest link id."""
+
+RECORD = struct.Struct('<qqB')
+"""Record layout: link id, expiration timestamp and revoked flag."""
+
+MAGIC = b'ZARLNK01'
+"""Magic bytes identifying the file format."""
+
+DELTA_MARGIN = 300
+"""Number of seconds modifications are looked back on a delta update.
+
+Covers clock skew between hosts and transactions committed after the
+revocation timestamp was taken.
+"""
+
+
+def _to_timestamp(dt):
+    """Convert a naive UTC datetime into a POSIX timestamp."""
+    return calendar.timegm(dt.utctimetuple()) if dt else 0
+
+
+def _from_timestamp(ts):
+    """Convert a POSIX timestamp into a naive UTC datetime."""
+    return datetime.utcfromtimestamp(ts) if ts else None
+
+
+class LinkIndex(object):
+    """Shared memory-mapped index of secret link states."""
+
+    def __init__(self, path, refresh_interval=60, max_age=300):
+        """Initialize index.
+
+        :param path: Path of the index file.
+        :param refresh_interval: Number of seconds between delta updates.
+        :param max_age: Number of seconds after the last update after which
+            the index is considered stale.
+        """
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._mmap = None
+        self._inode = None
+        self._checked_at = 0
+        self._refreshed_at = 0
+
+    def lookup(self, link_id):
+        """Get the state of a secret link.
+
+        :param link_id: Secret link id.
+        The index is updated with the links changed since the last update at
+        most every ``refresh_interval`` seconds, but it is never built here,
+        as lookups are done while serving requests.
+
+        :returns: A tuple ``(revoked, expires_at)`` or ``None`` if the state
+            of the link is not known (missing link, missing or stale index, or
+            failed update), in which case the database must be queried.
+        """
+        now = time.time()
+        if now - self._refreshed_at > self.refresh_interval:
+            self._refreshed_at = now
+            try:
+                self.refresh(rebuild=False)
+            except SQLAlchemyError:
+                pass
+
+        mm = self._get_mmap()
+        if mm is None:
+            return None
+
+        magic, count, synced_at, max_id = HEADER.unpack_from(mm, 0)
+        if now - synced_at > self.max_age or link_id > max_id:
+            return None
+
+        offset = self._find(mm, count, link_id)
+        if offset is None:
+            return None
+        _, expires, revoked = RECORD.unpack_from(mm, offset)
+        return bool(revoked), _from_timestamp(expires)
+
+    def mark_revoked(self, link_id):
+        """Mark a secret link as revoked in the shared mapping.
+
+        Must only be called once the revocation is committed.
+        """
+        self.mark_revoked_many([link_id])
+
+    def mark_revoked_many(self, link_ids):
+        """Mark several secret links as revoked in the shared mapping.
+
+        Must only be called once the revocations are committed.
+        """
+        with self._file_lock():
+            mm = self._get_mmap(force=True)
+            if mm is not None:
+                for link_id in link_ids:
+                    self._set_revoked(mm, link_id)
+
+    def refresh(self, rebuild=True):
+        """Update the index unless another process is already doing it.
+
+        The index is rebuilt if it does not exist or is stale, otherwise it
+        is updated with the links changed since the last update. The update
+        is done in a savepoint, so that a failing query does not abort the
+        transaction of the caller.
+
+        :param rebuild: Rebuild a missing or stale index. Default: True.
+        :returns: ``False`` if the index is locked by another process, or if
+            it is missing or stale and ``rebuild`` is not set.
+        """
+        try:
+            with self._file_lock(blocking=False):
+                mm = self._get_mmap(force=True)
+                age = None
+                if mm is not None:
+                    age = time.time() - HEADER.unpack_from(mm, 0)[2]
+                if age is None or age > self.max_age:
+                    if not rebuild:
+                        return False
+                    self._build()
+                elif age > self.refresh_interval:
+                    with db.session.begin_nested():
+                        self._update(mm)
+        except (IOError, OSError):
+            return False
+        return True
+
+    def build(self):
+        """Rebuild the index from the database."""
+        with self._file_lock():
+            self._build()
+
+    def _build(self):
+        """Write all links to a new index file (file lock must be held)."""
+        from .models import SecretLink
+
+        synced_at = int(time.time())
+        query = db.session.query(
+            SecretLink.id, SecretLink.revoked_at, SecretLink.expires_at
+        ).order_by(SecretLink.id).yield_per(1000)
+        self._write(b'', query, synced_at)
+
+    def _update(self, mm):
+        """Apply changes since the last update (file lock must be held).
+
+        The state of links modified since the last update is copied from the
+        database, so that e.g. revocations which were undone are cleared.
+        """
+        from .models import SecretLink
+
+        magic, count, synced_at, max_id = HEADER.unpack_from(mm, 0)
+        now = int(time.time())
+        columns = (SecretLink.id, SecretLink.revoked_at, SecretLink.expires_at)
+
+        modified = db.session.query(*columns).filter(
+            SecretLink.id <= max_id,
+            SecretLink.modified >= _from_timestamp(
+                max(synced_at - DELTA_MARGIN, 1)),
+        ).all()
+        created = db.session.query(*columns).filter(
+            SecretLink.id > max_id
+        ).order_by(SecretLink.id).all()
+
+        for link_id, revoked_at, expires_at in modified:
+            offset = self._find(mm, count, link_id)
+            if offset is not None:
+                RECORD.pack_into(mm, offset, link_id,
+                                 _to_timestamp(expires_at),
+                                 revoked_at is not None)
+        if created:
+            self._write(
+                mm[HEADER.size:HEADER.size + count * RECORD.size],
+                created, now, count=count, max_id=max_id
+            )
+        else:
+            HEADER.pack_into(mm, 0, MAGIC, count, now, max_id)
+
+    def _write(self, data, links, synced_at, count=0, max_id=0):
+        """Atomically replace the index file.
+
+        :param data: Packed records to copy from the current index.
+        :param links: Iterable of ``(id, revoked_at, expires_at)`` tuples
+            sorted by id, appended after ``data``.
+        :param synced_at: Sync timestamp to store in the header.
+        :param count: Number of records in ``data``.
+        :param max_id: Highest link id in ``data``.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.linkindex')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(HEADER.pack(MAGIC, 0, 0, 0))
+                fp.write(data)
+                for link_id, revoked_at, expires_at in links:
+                    fp.write(RECORD.pack(
+                        link_id, _to_timestamp(expires_at),
+                        revoked_at is not None
+                    ))
+                    count += 1
+                    max_id = link_id
+                fp.seek(0)
+                fp.write(HEADER.pack(MAGIC, count, synced_at, max_id))
+                fp.flush()
+                os.fsync(fp.fileno())
+            os.rename(tmp_path, self.path)
+        except Exception:
+            os.unlink(tmp_path)
+            raise
+        self._get_mmap(force=True)
+
+    def _get_mmap(self, force=False):
+        """Get mapping of the current index file.
+
+        The file is checked for replacement at most once per second, unless
+        ``force`` is set.
+        """
+        now = time.time()
+        if not force and self._mmap is not None and now - self._checked_at < 1:
+            return self._mmap
+
+        with self._lock:
+            self._checked_at = now
+            try:
+                inode = os.stat(self.path).st_ino
+            except OSError:
+                self._mmap = self._inode = None
+                return None
+            if inode != self._inode:
+                with open(self.path, 'r+b') as fp:
+                    mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_WRITE)
+                if len(mm) < HEADER.size or mm[:len(MAGIC)] != MAGIC:
+                    return None
+                # Previous mappings are left to the garbage collector, as
+                # concurrent lookups may still be reading them.
+                self._mmap, self._inode = mm, inode
+            return self._mmap
+
+    @staticmethod
+    def _find(mm, count, link_id):
+        """Binary search for the offset of a link record."""
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            offset = HEADER.size + mid * RECORD.size
+            current = RECORD.unpack_from(mm, offset)[0]
+            if current < link_id:
+                lo = mid + 1
+            elif current > link_id:
+                hi = mid
+            else:
+                return offset
+        return None
+
+    def _set_revoked(self, mm, link_id):
+        """Set revoked flag of a link record in a mapping."""
+        offset = self._find(mm, HEADER.unpack_from(mm, 0)[1], link_id)
+        if offset is not None:
+            struct.pack_into('<B', mm, offset + RECORD.size - 1, 1)
+
+    @contextmanager
+    def _file_lock(self, blocking=True):
+        """Hold an exclusive lock shared by all processes on the host."""
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        with open(self.path + '.lock', 'a') as fp:
+            fcntl.flock(fp.fileno(), flags)
+            try:
+                yield
+            finally:
+                fcntl.flock(fp.fileno(), fcntl.LOCK_UN)
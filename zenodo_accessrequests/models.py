@@ -24,19 +24,25 @@
 
 from __future__ import absolute_import, print_function
 
-from copy import deepcopy
 from datetime import date, datetime
 
 from flask import current_app, url_for
 from flask_babelex import gettext as _
 from invenio_accounts.models import User
 from invenio_db import db
-from sqlalchemy_utils.types import ChoiceType, EncryptedType
+from sqlalchemy import event, func, inspect, or_
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql.expression import desc
+from sqlalchemy_utils.types import ChoiceType, JSONType
 
+from .crypto import CachedEncryptedType
 from .errors import InvalidRequestStateError
-from .signals import link_created, link_revoked, request_accepted, \
-    request_confirmed, request_created, request_rejected
-from .tokens import SecretLinkFactory
+from .proxies import current_zenodo_accessrequests
+from .search import create_fts_table, create_gin_index, drop_fts_table, \
+    link_deleted, link_inserted, link_updated, match_links
+from .signals import link_created, link_revoked, links_revoked, \
+    request_accepted, request_confirmed, request_created, request_rejected
+from .tokens import SecretLinkFactory, TokenMixin, token_digest
 
 # TODO: UTC timestamps + localization.
 
@@ -46,6 +52,34 @@ def secret_key():
     return current_app.config['SECRET_KEY'].encode('utf-8')
 
 
+def recid_from_data(extra_data):
+    """Get the integer record id from extra data of a secret link.
+
+    :returns: The record id or ``None`` if the extra data has no (integer)
+        record id.
+    """
+    try:
+        return int((extra_data or {}).get('recid'))
+    except (TypeError, ValueError):
+        return None
+
+
+def load_options(model, load):
+    """Get query options to eagerly load relationships of a model.
+
+    :param model: Model class.
+    :param load: Names of relationships to load in the same query with a
+        join, or a dictionary mapping names to a loading strategy
+        (``'joined'`` or ``'selectin'``).
+    :returns: List of query options.
+    """
+    strategies = dict(joined=db.joinedload, selectin=db.selectinload)
+    if not isinstance(load, dict):
+        load = dict.fromkeys(load, 'joined')
+    return [strategies[strategy](getattr(model, name))
+            for name, strategy in sorted(load.items())]
+
+
 class RequestStatus(object):
     """Access request status representation."""
 
@@ -60,15 +94,33 @@ class SecretLink(db.Model):
 
     __tablename__ = 'accessrequests_link'
 
+    __table_args__ = (
+        db.Index('ix_accessrequests_link_revoked_at_expires_at',
+                 'revoked_at', 'expires_at'),
+        db.Index('ix_accessrequests_link_owner_revoked_at_created',
+                 'owner_user_id', 'revoked_at', 'created'),
+        db.Index('ix_accessrequests_link_owner_revoked_at_title',
+                 'owner_user_id', 'revoked_at', 'title'),
+        db.Index('ix_accessrequests_link_owner_revoked_at_expires_at',
+                 'owner_user_id', 'revoked_at', 'expires_at'),
+    )
+
     id = db.Column(db.Integer, primary_key=True,
                    autoincrement=True)
     """Secret link id."""
 
-    token = db.Column(
-        EncryptedType(type_in=db.Text, key=secret_key),
+    token = db.deferred(db.Column(
+        CachedEncryptedType(type_in=db.Text, key=secret_key),
         nullable=False
-    )
-    """Secret token for link (should be stored encrypted)."""
+    ))
+    """Secret token for link (should be stored encrypted).
+
+    The column is deferred, so that tokens are only decrypted when accessed.
+    """
+
+    token_digest = db.Column(db.String(64), nullable=True, unique=True,
+                             index=True)
+    """Keyed digest of the token for looking up links by token."""
 
     owner_user_id = db.Column(
         db.Integer, db.ForeignKey(User.id),
@@ -86,15 +138,25 @@ class SecretLink(db.Model):
     expires_at = db.Column(db.DateTime, nullable=True)
     """Expiration date."""
 
-    revoked_at = db.Column(db.DateTime, nullable=True, index=True)
+    revoked_at = db.Column(db.DateTime, nullable=True)
     """Creation timestamp."""
 
+    modified = db.Column(db.DateTime, nullable=False, default=datetime.utcnow,
+                         onupdate=datetime.utcnow, index=True)
+    """Last modification timestamp."""
+
     title = db.Column(db.String(length=255), nullable=False, default='')
     """Title of link."""
 
     description = db.Column(db.Text, nullable=False, default='')
     """Description of link."""
 
+    recid = db.Column(db.Integer, nullable=True, index=True)
+    """Record id of the record the link gives access to."""
+
+    _extra_data = db.Column('extra_data', JSONType, nullable=True)
+    """Extra data stored in the token (see ``extra_data``)."""
+
     @classmethod
     def create(cls, title, owner, extra_data, description="", expires_at=None):
         """Create a new secret link."""
@@ -108,6 +170,8 @@ class SecretLink(db.Model):
                 description=description,
                 expires_at=expires_at,
                 token='',
+                recid=recid_from_data(extra_data),
+                _extra_data=extra_data,
             )
             db.session.add(obj)
 
@@ -116,6 +180,7 @@ class SecretLink(db.Model):
             obj.token = SecretLinkFactory.create_token(
                 obj.id, extra_data, expires_at=expires_at
             ).decode('utf8')
+            obj.token_digest = token_digest(obj.token)
 
         link_created.send(obj)
         return obj
@@ -125,32 +190,143 @@ class SecretLink(db.Model):
         """Validate a secret link token.
 
         Only queries the database if token is valid to determine that the token
-        has not been revoked.
+        has neither been revoked nor expired, and only if the state of the
+        link is not found in the shared link index (see
+        ``ACCESSREQUESTS_LINK_INDEX_PATH``).
+        Valid tokens are cached for a short time (see
+        ``ACCESSREQUESTS_TOKEN_CACHE_TTL``), so that repeated requests with the
+        same token neither verify the signature nor query the database.
         """
-        data = SecretLinkFactory.validate_token(
-            token, expected_data=expected_data
+        cache = current_zenodo_accessrequests.token_cache
+
+        data = cache.get(token)
+        if data is not None:
+            return TokenMixin.match_data(data, expected_data)
+
+        data = SecretLinkFactory.validate_token(token)
+        if not data or not TokenMixin.match_data(data, expected_data):
+            return False
+
+        state = None
+        index = current_zenodo_accessrequests.link_index
+        if index is not None:
+            state = index.lookup(data['id'])
+        if state is None:
+            row = cls.query_valid().with_entities(cls.expires_at).filter(
+                cls.id == data['id']).first()
+            if row is None:
+                return False
+            state = (False, row.expires_at)
+
+        revoked, expires_at = state
+        if revoked or (expires_at and datetime.utcnow() > expires_at):
+            return False
+        cache.set(token, data['id'], data, expires_at=expires_at)
+        return True
+
+    @classmethod
+    def query_valid(cls):
+        """Get secret links which are neither revoked nor expired."""
+        return cls.query.filter(
+            cls.revoked_at.is_(None),
+            or_(cls.expires_at.is_(None), cls.expires_at > datetime.utcnow()),
         )
 
-        if data:
-            link = cls.query.get(data['id'])
-            if link and link.is_valid():
-                return True
-        return False
+    @classmethod
+    def query_by_owner(cls, user, with_token=False, load=()):
+        """Get secret links by user.
+
+        :param with_token: Load the tokens in the same query, e.g. for
+            listing the URLs of the links. Default: False.
+        :param load: Relationships to load with the links (see
+            :func:`load_options`), e.g. ``('owner', )``.
+        """
+        query = cls.query.filter_by(
+            owner_user_id=user.id
+        ).options(*load_options(cls, load))
+        return query.options(db.undefer(cls.token)) if with_token else query
 
     @classmethod
-    def query_by_owner(cls, user):
-        """Get secret links by user."""
+    def search(cls, owner, q, ranked=True, with_token=False, load=()):
+        """Search the links of a user by title and description.
+
+        Links match if their title or description contains a word starting
+        with each of the terms of the query. Revoked links are not returned.
+
+        :param owner: Owner of the links.
+        :param q: Query string.
+        :param ranked: Order the links by relevance. Default: True.
+        :param with_token: Load the tokens in the same query.
+        :param load: Relationships to load with the links.
+        """
+        hits = match_links(q).alias('hits')
+        query = cls.query_by_owner(
+            owner, with_token=with_token, load=load
+        ).join(
+            hits, hits.c.id == cls.id
+        ).filter(cls.revoked_at.is_(None))
+        return query.order_by(desc(hits.c.rank), cls.id) if ranked \
+            else query
+
+    @classmethod
+    def load_tokens(cls, links):
+        """Load the tokens of links in one query.
+
+        Unlike ``with_token``, only the tokens of the given links are fetched
+        and decrypted, e.g. those of the links shown on a page rather than of
+        every link loaded to build it.
+
+        :param links: Links loaded in the current session.
+        :returns: The links.
+        """
+        ids = [l.id for l in links if 'token' in inspect(l).unloaded]
+        if ids:
+            cls.query.options(db.load_only(cls.id, cls.token)).filter(
+                cls.id.in_(ids)).all()
+        return links
+
+    @classmethod
+    def get_by_token(cls, token):
+        """Get a secret link by its token.
+
+        The token is neither verified nor decoded, but looked up by its
+        digest.
+        """
         return cls.query.filter_by(
-            owner_user_id=user.id
-        )
+            token_digest=token_digest(token)
+        ).one_or_none()
+
+    @classmethod
+    def query_by_record(cls, recid):
+        """Get secret links by record id."""
+        return cls.query.filter_by(recid=recid)
 
     @property
     def extra_data(self):
-        """Load token data stored in token (ignores expiry date of tokens)."""
+        """Extra data stored in the token.
+
+        Links created before the extra data was stored in its own column load
+        it from the token (ignores expiry date of tokens).
+        """
+        if self._extra_data is not None:
+            return self._extra_data
         if self.token:
             return SecretLinkFactory.load_token(self.token, force=True)["data"]
         return None
 
+    def backfill(self):
+        """Store record id, extra data and digest of the token in columns.
+
+        :returns: ``False`` if the token could not be loaded.
+        """
+        self.token_digest = token_digest(self.token)
+        data = SecretLinkFactory.load_token(self.token, force=True)
+        if data is None:
+            return False
+        self._extra_data = data["data"]
+        self.recid = recid_from_data(self._extra_data)
+        return True
+
     def get_absolute_url(self, endpoint):
         """Get absolute for secret link (using https scheme).
 
@@ -165,12 +341,12 @@ class SecretLink(db.Model):
 
             >>> url_for('record.metadata', token="...", recid=1, )
         """
-        copy = deepcopy(self.extra_data)
+        copy = dict(self.extra_data or {})
         if 'recid' in copy:
             copy['pid_value'] = copy.pop('recid')
         return url_for(
             endpoint, token=self.token,
-            _external=True, **(copy or {})
+            _external=True, **copy
         )
 
     def revoke(self):
@@ -182,6 +358,78 @@ class SecretLink(db.Model):
             return True
         return False
 
+    @classmethod
+    def revoke_many(cls, recid=None, owner=None, ids=None,
+                    created_before=None):
+        """Revoke all non-revoked secret links matching the given filters.
+
+        Expired links are revoked as well, which :meth:`revoke_expired`
+        relies on. Links are revoked with a single ``UPDATE`` statement, and
+        a single ``links-revoked`` signal is sent with the ids of the revoked
+        links.
+
+        :param recid: Revoke links to the record.
+        :param owner: Revoke links owned by the user.
+        :param ids: Revoke links with the ids.
+        :param created_before: Revoke links created before the date.
+        :returns: List of ids of the revoked links.
+        """
+        assert recid is not None or owner is not None or ids is not None or \
+            created_before is not None
+
+        query = cls.query.filter(cls.revoked_at.is_(None))
+        if recid is not None:
+            query = query.filter(cls.recid == recid)
+        if owner is not None:
+            query = query.filter(cls.owner_user_id == owner.id)
+        if ids is not None:
+            if not ids:
+                return []
+            query = query.filter(cls.id.in_(ids))
+        if created_before is not None:
+            query = query.filter(cls.created < created_before)
+
+        values = {cls.revoked_at: datetime.utcnow()}
+        with db.session.begin_nested():
+            if db.engine.dialect.implicit_returning:
+                stmt = cls.__table__.update().where(
+                    query.whereclause
+                ).values(values).returning(cls.id)
+                link_ids = [
+                    row[0] for row in db.session.execute(stmt)
+                ]
+            else:
+                link_ids = [
+                    row[0] for row in query.with_entities(cls.id)
+                ]
+                if link_ids:
+                    query.update(values, synchronize_session=False)
+
+        # Refresh links revoked behind the back of the session.
+        for obj in list(db.session.identity_map.values()):
+            if isinstance(obj, cls) and obj.id in link_ids:
+                db.session.expire(obj, ['revoked_at'])
+
+        if link_ids:
+            links_revoked.send(cls, link_ids=link_ids)
+        return link_ids
+
+    @classmethod
+    def revoke_expired(cls, batch_size=1000):
+        """Revoke a batch of expired secret links.
+
+        Links are selected by the index on ``revoked_at`` and ``expires_at``,
+        oldest expiration date first, and revoked with ``revoke_many``.
+
+        :param batch_size: Maximum number of links to revoke.
+        :returns: List of ids of the revoked links.
+        """
+        link_ids = [row[0] for row in cls.query.with_entities(cls.id).filter(
+            cls.revoked_at.is_(None),
+            cls.expires_at <= datetime.utcnow(),
+        ).order_by(cls.expires_at).limit(batch_size)]
+        return cls.revoke_many(ids=link_ids)
+
     def is_expired(self):
         """Determine if link is expired."""
         if self.expires_at:
@@ -197,11 +445,24 @@ class SecretLink(db.Model):
         return not(self.is_expired() or self.is_revoked())
 
 
+event.listen(SecretLink.__table__, 'after_create', create_fts_table)
+event.listen(SecretLink.__table__, 'after_create', create_gin_index)
+event.listen(SecretLink.__table__, 'before_drop', drop_fts_table)
+event.listen(SecretLink, 'after_insert', link_inserted)
+event.listen(SecretLink, 'after_update', link_updated)
+event.listen(SecretLink, 'after_delete', link_deleted)
+
+
 class AccessRequest(db.Model):
     """Represent an request for access to restricted files in a record."""
 
     __tablename__ = 'accessrequests_request'
 
+    __table_args__ = (
+        db.Index('ix_accessrequests_request_receiver_status_created',
+                 'receiver_user_id', 'status', 'created'),
+    )
+
     STATUS_CODES = {
         RequestStatus.EMAIL_VALIDATION: _(u'Email validation'),
         RequestStatus.PENDING: _(u'Pending'),
@@ -213,16 +474,20 @@ class AccessRequest(db.Model):
                    autoincrement=True)
     """Access request ID."""
 
-    status = db.Column(
+    status = db.column_property(db.Column(
         ChoiceType(STATUS_CODES.items(), impl=db.CHAR(1)),
-        nullable=False, index=True
-    )
-    """Status of request."""
+        nullable=False
+    ), active_history=True)
+    """Status of request.
+
+    The previous status is loaded on change for counting pending requests
+    (see :class:`PendingRequestCount`).
+    """
 
-    receiver_user_id = db.Column(
+    receiver_user_id = db.column_property(db.Column(
         db.Integer, db.ForeignKey(User.id),
         nullable=False, default=None
-    )
+    ), active_history=True)
     """Receiver's user id."""
 
     receiver = db.relationship(User, foreign_keys=[receiver_user_id])
@@ -230,7 +495,7 @@ class AccessRequest(db.Model):
 
     sender_user_id = db.Column(
         db.Integer, db.ForeignKey(User.id),
-        nullable=True, default=None
+        nullable=True, default=None, index=True
     )
     """Sender's user id (for authenticated users)."""
 
@@ -264,7 +529,7 @@ class AccessRequest(db.Model):
 
     link_id = db.Column(
         db.Integer, db.ForeignKey(SecretLink.id),
-        nullable=True, default=None
+        nullable=True, default=None, index=True
     )
     """Relation to secret link if request was accepted."""
 
@@ -318,19 +583,36 @@ class AccessRequest(db.Model):
         return obj
 
     @classmethod
-    def query_by_receiver(cls, user):
-        """Get access requests for a specific receiver."""
+    def query_by_receiver(cls, user, load=()):
+        """Get access requests for a specific receiver.
+
+        :param load: Relationships to load with the requests (see
+            :func:`load_options`), e.g. ``('sender', 'link')``.
+        """
         return cls.query.filter_by(
             receiver_user_id=user.id
-        )
+        ).options(*load_options(cls, load))
 
     @classmethod
-    def get_by_receiver(cls, request_id, user):
-        """Get access request for a specific receiver."""
+    def get_by_receiver(cls, request_id, user, load=()):
+        """Get access request for a specific receiver.
+
+        :param load: Relationships to load with the request.
+        """
         return cls.query.filter_by(
             id=request_id,
             receiver_user_id=user.id
-        ).first()
+        ).options(*load_options(cls, load)).first()
+
+    @classmethod
+    def get_by_id(cls, request_id, load=()):
+        """Get access request by id.
+
+        :param load: Relationships to load with the request.
+        """
+        return cls.query.filter_by(
+            id=request_id
+        ).options(*load_options(cls, load)).first()
 
     def confirm_email(self):
         """Confirm that senders email is valid."""
@@ -367,3 +649,133 @@ class AccessRequest(db.Model):
             expires_at=expires_at,
         )
         return self.link
+
+
+class PendingRequestCount(db.Model):
+    """Represent the number of pending access requests of a receiver.
+
+    Counters are updated by mapper events of the access requests, in the
+    same transaction as the requests, so that changes made through the ORM
+    (e.g. in the admin interface) are counted. A receiver without a counter
+    has no pending requests. Changes made outside of the ORM require
+    recomputing the counters (see ``flask accessrequests
+    recompute-pending-counts``).
+    """
+
+    __tablename__ = 'accessrequests_pending_count'
+
+    user_id = db.Column(db.Integer, db.ForeignKey(User.id), primary_key=True)
+    """Receiver's user id."""
+
+    count = db.Column(db.Integer, nullable=False, default=0)
+    """Number of pending access requests."""
+
+    @classmethod
+    def get(cls, user_id):
+        """Get the number of pending access requests of a receiver."""
+        return db.session.query(cls.count).filter_by(
+            user_id=user_id
+        ).scalar() or 0
+
+    @classmethod
+    def increment(cls, user_id, delta=1, connection=None):
+        """Add to the number of pending access requests of a receiver.
+
+        A missing counter means that the receiver has no pending requests,
+        as counters are created by the migration and by :meth:`recompute`, so
+        it is created with the delta. Recomputing it instead would count the
+        requests of the flush twice, as all of them are inserted before their
+        mapper hooks run. If another transaction creates the counter
+        concurrently, it is incremented instead.
+
+        :param connection: Connection to use, e.g. during a flush. Default:
+            the connection of the session.
+        """
+        connection = connection or db.session.connection()
+        table = cls.__table__
+        update = table.update().where(table.c.user_id == user_id).values(
+            count=table.c.count + delta)
+        if connection.execute(update).rowcount:
+            return
+        insert = table.insert().values(user_id=user_id, count=max(delta, 0))
+        try:
+            with connection.begin_nested():
+                connection.execute(insert)
+        except IntegrityError:
+            connection.execute(update)
+
+    @classmethod
+    def recompute(cls, user_id=None):
+        """Recompute counters from the access requests.
+
+        :param user_id: Only recompute the counter of this receiver.
+        """
+        counters = cls.query
+        if user_id is not None:
+            counters = counters.filter_by(user_id=user_id)
+
+        with db.session.begin_nested():
+            counters.delete(synchronize_session=False)
+            db.session.execute(cls._insert_counts(user_id))
+
+    @classmethod
+    def _insert_counts(cls, user_id=None):
+        """Get the statement inserting counters computed from the requests.
+
+        :param user_id: Only insert the counter of this receiver.
+        """
+        counts = db.session.query(
+            AccessRequest.receiver_user_id, func.count(AccessRequest.id)
+        ).filter(
+            AccessRequest.status == RequestStatus.PENDING
+        ).group_by(AccessRequest.receiver_user_id)
+        if user_id is not None:
+            counts = counts.filter(AccessRequest.receiver_user_id == user_id)
+        return cls.__table__.insert().from_select(
+            ['user_id', 'count'], counts.statement)
+
+
+def _count_inserted_request(mapper, connection, request):
+    """Mapper hook counting new pending requests."""
+    if request.status == RequestStatus.PENDING:
+        PendingRequestCount.increment(
+            request.receiver_user_id, connection=connection)
+
+
+def _count_updated_request(mapper, connection, request):
+    """Mapper hook counting requests entering or leaving pending status."""
+    attrs = inspect(request).attrs
+    status = attrs.status.history
+    receiver = attrs.receiver_user_id.history
+    if not (status.has_changes() or receiver.has_changes()):
+        return
+    old_status = status.deleted[0] if status.deleted else request.status
+    old_receiver = receiver.deleted[0] if receiver.deleted \
+        else request.receiver_user_id
+    if old_status == RequestStatus.PENDING:
+        PendingRequestCount.increment(
+            old_receiver, -1, connection=connection)
+    if request.status == RequestStatus.PENDING:
+        PendingRequestCount.increment(
+            request.receiver_user_id, connection=connection)
+
+
+def _load_deleted_request(mapper, connection, request):
+    """Mapper hook loading the state of requests before their deletion.
+
+    Expired attributes can no longer be loaded once the request is deleted.
+    """
+    request.status, request.receiver_user_id
+
+
+def _count_deleted_request(mapper, connection, request):
+    """Mapper hook counting deleted pending requests."""
+    if request.status == RequestStatus.PENDING:
+        PendingRequestCount.increment(
+            request.receiver_user_id, -1, connection=connection)
+
+
+event.listen(AccessRequest, 'after_insert', _count_inserted_request)
+event.listen(AccessRequest, 'after_update', _count_updated_request)
+event.listen(AccessRequest, 'before_delete', _load_deleted_request)
+event.listen(AccessRequest, 'after_delete', _count_deleted_request)
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Permissions for access requests."""
+
+from __future__ import absolute_import, print_function
+
+from invenio_access import Permission, action_factory
+
+introspect_tokens_action = action_factory('accessrequests-introspect-tokens')
+"""Action needed to check secret link tokens with the REST API."""
+
+
+def introspect_tokens_permission_factory():
+    """Permission to check secret link tokens with the REST API."""
+    return Permission(introspect_tokens_action)
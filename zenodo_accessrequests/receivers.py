@@ -29,13 +29,19 @@ from datetime import timedelta
 from flask import current_app, render_template, url_for
 from flask_babelex import gettext as _
 from flask_mail import Message
+from invenio_db import db
 from invenio_mail.tasks import send_email
+from invenio_records.signals import after_record_delete, after_record_revert, \
+    after_record_update
+from sqlalchemy import event
 
 from .errors import RecordNotFound
-from .signals import request_accepted, request_confirmed, request_created, \
-    request_rejected
-from .tokens import EmailConfirmationSerializer
-from .utils import get_record
+from .proxies import current_zenodo_accessrequests
+from .search import unindex_links
+from .signals import link_revoked, links_revoked, request_accepted, \
+    request_confirmed, request_created, request_rejected
+from .tokens import EmailConfirmationSerializer, current_key_id
+from .utils import get_record_metadata, invalidate_record
 
 
 def connect_receivers():
@@ -46,11 +52,22 @@ def connect_receivers():
     # Order is important:
     request_accepted.connect(create_secret_link)
     request_accepted.connect(send_accept_notification)
+    link_revoked.connect(evict_cached_tokens)
+    link_revoked.connect(update_link_index)
+    links_revoked.connect(evict_cached_tokens_many)
+    links_revoked.connect(update_link_index_many)
+    links_revoked.connect(remove_from_search_index_many)
+    after_record_update.connect(invalidate_cached_record)
+    after_record_revert.connect(invalidate_cached_record)
+    after_record_delete.connect(invalidate_cached_record)
+    event.listen(db.session, 'after_commit', apply_link_index_revocations)
+    event.listen(db.session, 'after_commit', apply_record_invalidations)
+    event.listen(db.session, 'after_transaction_end', discard_session_changes)
 
 
 def create_secret_link(request, message=None, expires_at=None):
     """Receiver for request-accepted signal."""
-    pid, record = get_record(request.recid)
+    record = get_record_metadata(request.recid)
     if not record:
         raise RecordNotFound(request.recid)
 
@@ -58,7 +75,6 @@ def create_secret_link(request, message=None, expires_at=None):
         "zenodo_accessrequests/link_description.tpl",
         request=request,
         record=record,
-        pid=pid,
         expires_at=expires_at,
         message=message,
     )
@@ -72,14 +88,13 @@ def create_secret_link(request, message=None, expires_at=None):
 
 def send_accept_notification(request, message=None, expires_at=None):
     """Receiver for request-accepted signal to send email notification."""
-    pid, record = get_record(request.recid)
+    record = get_record_metadata(request.recid)
     _send_notification(
         request.sender_email,
         _("Access request accepted"),
         "zenodo_accessrequests/emails/accepted.tpl",
         request=request,
         record=record,
-        pid=pid,
         record_link=request.link.get_absolute_url('invenio_records_ui.recid'),
         message=message,
         expires_at=expires_at,
@@ -88,7 +103,7 @@ def send_accept_notification(request, message=None, expires_at=None):
 
 def send_confirmed_notifications(request):
     """Receiver for request-confirmed signal to send email notification."""
-    pid, record = get_record(request.recid)
+    record = get_record_metadata(request.recid)
     if record is None:
         current_app.logger.error("Cannot retrieve record %s. Emails not sent"
                                  % request.recid)
@@ -101,7 +116,6 @@ def send_confirmed_notifications(request):
         "zenodo_accessrequests/emails/new_request.tpl",
         request=request,
         record=record,
-        pid=pid,
     )
 
     _send_notification(
@@ -110,16 +124,16 @@ def send_confirmed_notifications(request):
         "zenodo_accessrequests/emails/confirmation.tpl",
         request=request,
         record=record,
-        pid=pid,
     )
 
 
 def send_email_validation(request):
     """Receiver for request-created signal to send email notification."""
-    token = EmailConfirmationSerializer().create_token(
+    serializer = EmailConfirmationSerializer(key_id=current_key_id())
+    token = serializer.create_token(
         request.id, dict(email=request.sender_email)
     )
-    pid, record = get_record(request.recid)
+    record = get_record_metadata(request.recid)
 
     _send_notification(
         request.sender_email,
@@ -127,7 +141,6 @@ def send_email_validation(request):
         "zenodo_accessrequests/emails/validate_email.tpl",
         request=request,
         record=record,
-        pid=pid,
         days=timedelta(
             seconds=current_app.config["ACCESSREQUESTS_CONFIRMLINK_EXPIRES_IN"]
         ).days,
@@ -142,18 +155,128 @@ def send_email_validation(request):
 
 def send_reject_notification(request, message=None):
     """Receiver for request-rejected signal to send email notification."""
-    pid, record = get_record(request.recid)
+    record = get_record_metadata(request.recid)
     _send_notification(
         request.sender_email,
         _("Access request rejected"),
         "zenodo_accessrequests/emails/rejected.tpl",
         request=request,
         record=record,
-        pid=pid,
         message=message,
     )
 
 
+def evict_cached_tokens(link):
+    """Receiver for link-revoked signal to evict cached tokens."""
+    current_zenodo_accessrequests.token_cache.evict_link(link.id)
+
+
+def update_link_index(link):
+    """Receiver for link-revoked signal to update the shared link index."""
+    _add_link_index_revocations([link.id])
+
+
+def evict_cached_tokens_many(sender, link_ids=None):
+    """Receiver for links-revoked signal to evict cached tokens."""
+    current_zenodo_accessrequests.token_cache.evict_links(link_ids)
+
+
+def update_link_index_many(sender, link_ids=None):
+    """Receiver for links-revoked signal to update the shared link index."""
+    _add_link_index_revocations(link_ids)
+
+
+def _add_link_index_revocations(link_ids):
+    """Collect revoked links to mark in the link index after commit."""
+    if current_zenodo_accessrequests.link_index is not None:
+        _add_uncommitted('accessrequests-revoked-links', link_ids)
+
+
+def _add_uncommitted(key, values):
+    """Collect values to apply once the current transaction is committed.
+
+    Values are collected per transaction, so that the values of a savepoint
+    which is rolled back are discarded.
+    """
+    session = db.session()
+    session.info.setdefault(key, {}).setdefault(
+        session.transaction, set()).update(values)
+
+
+def _pop_committed(session, key):
+    """Get the values collected in a transaction which is committed.
+
+    The values of a savepoint are moved to the enclosing transaction, so
+    that they are only returned once the outermost transaction is committed.
+    """
+    transaction = session.transaction
+    values = session.info.get(key, {}).pop(transaction, set())
+    if transaction.nested:
+        if values:
+            session.info[key].setdefault(
+                transaction.parent, set()).update(values)
+        return set()
+    return values
+
+
+def apply_link_index_revocations(session):
+    """Session hook marking revoked links in the link index after commit.
+
+    Revocations are only written to the shared index once committed, as the
+    index would otherwise keep links revoked in transactions which are
+    rolled back.
+    """
+    link_ids = _pop_committed(session, 'accessrequests-revoked-links')
+    if link_ids:
+        try:
+            current_zenodo_accessrequests.link_index.mark_revoked_many(
+                sorted(link_ids))
+        except (IOError, OSError):
+            # The next delta update of the index picks the revocations up.
+            current_app.logger.exception('Cannot update secret link index.')
+
+
+def discard_session_changes(session, transaction):
+    """Session hook discarding changes not applied after commit.
+
+    Discards e.g. the revoked links and updated records of transactions and
+    savepoints which are rolled back. Values of subtransactions are moved to
+    the enclosing transaction.
+    """
+    for key in ('accessrequests-revoked-links',
+                'accessrequests-updated-records'):
+        pending = session.info.get(key)
+        values = pending.pop(transaction, None) if pending else None
+        if values and transaction.parent is not None and \
+                not transaction.nested:
+            pending.setdefault(transaction.parent, set()).update(values)
+
+
+def remove_from_search_index_many(sender, link_ids=None):
+    """Receiver for links-revoked signal to update the search index.
+
+    Links revoked in bulk bypass the mapper events updating the index.
+    """
+    unindex_links(db.session.connection(), link_ids)
+
+
+def invalidate_cached_record(sender, record=None, **kwargs):
+    """Receiver for record signals to invalidate the record cache.
+
+    The record is invalidated again after commit, as other requests may
+    cache its previous fields until then.
+    """
+    if 'zenodo-accessrequests' in current_app.extensions:
+        _add_uncommitted('accessrequests-updated-records',
+                         invalidate_record(record))
+
+
+def apply_record_invalidations(session):
+    """Session hook invalidating updated records after commit."""
+    for key in _pop_committed(session, 'accessrequests-updated-records'):
+        current_zenodo_accessrequests.record_cache.delete(key)
+
+
 def _send_notification(to, subject, template, **ctx):
     """Render a template and send as email."""
     msg = Message(
@@ -0,0 +1,169 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Cache of the record fields needed by access requests.
+
+Access request pages and emails only need a few fields of a record (see
+``ACCESSREQUESTS_RECORD_FIELDS``). These fields are cached by record
+id, so that repeated lookups of a record neither resolve its persistent
+identifier nor load its JSON. Entries are removed when records are updated,
+reverted or deleted, and expire after a time-to-live, which bounds how long
+process-local caches in other processes serve outdated fields.
+"""
+
+from __future__ import absolute_import, print_function
+
+import json
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUBackend(object):
+    """Process-local LRU cache backend."""
+
+    def __init__(self, maxsize=1000):
+        """Initialize backend.
+
+        :param maxsize: Maximum number of cached entries.
+        """
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+    def get(self, key):
+        """Get an entry or ``None`` if it is not cached."""
+        with self._lock:
+            value = self._entries.pop(key, None)
+            if value is not None:
+                # Re-insert to mark the entry as most recently used.
+                self._entries[key] = value
+            return value
+
+    def set(self, key, value, ttl=None):
+        """Cache an entry.
+
+        :param ttl: Ignored, entries are only removed when evicted.
+        """
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = value
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        """Remove an entry."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all entries."""
+        with self._lock:
+            self._entries.clear()
+
+
+class KVBackend(object):
+    """Cache backend storing entries in a key-value store.
+
+    The store must implement the interface of the ``simplekv`` stores, e.g.
+    a ``RedisStore`` shared by all processes, or a ``DictStore``. Stores
+    supporting a time-to-live (see ``simplekv.TimeToLiveMixin``) remove
+    expired entries themselves.
+    """
+
+    def __init__(self, store, prefix='accessrequests_record_'):
+        """Initialize backend.
+
+        :param store: Key-value store.
+        :param prefix: Prefix of the keys in the store.
+        """
+        self.store = store
+        self.prefix = prefix
+
+    def get(self, key):
+        """Get an entry or ``None`` if it is not cached."""
+        try:
+            return json.loads(
+                self.store.get(self.prefix + key).decode('utf-8'))
+        except KeyError:
+            return None
+
+    def set(self, key, value, ttl=None):
+        """Cache an entry.
+
+        :param ttl: Number of seconds after which the store removes the
+            entry, if it supports a time-to-live.
+        """
+        data = json.dumps(value).encode('utf-8')
+        if ttl and getattr(self.store, 'ttl_support', False):
+            self.store.put(self.prefix + key, data, ttl_secs=ttl)
+        else:
+            self.store.put(self.prefix + key, data)
+
+    def delete(self, key):
+        """Remove an entry."""
+        self.store.delete(self.prefix + key)
+
+
+class RecordCache(object):
+    """Cache of the fields of records, keyed by record id."""
+
+    def __init__(self, backend, fields, ttl=300):
+        """Initialize cache.
+
+        :param backend: Cache backend, e.g. :class:`LRUBackend`.
+        :param fields: Names of the cached record fields.
+        :param ttl: Number of seconds a record is cached. ``0`` disables the
+            cache.
+        """
+        self.backend = backend
+        self.fields = fields
+        self.ttl = ttl
+
+    def get(self, recid):
+        """Get the cached fields of a record.
+
+        :returns: A dictionary of the fields or ``None`` if the record is not
+            cached or the entry has expired.
+        """
+        if self.ttl <= 0:
+            return None
+        entry = self.backend.get(str(recid))
+        if entry is None or entry['expires'] <= time.time():
+            return None
+        return dict(entry['data'])
+
+    def set(self, recid, record):
+        """Cache the fields of a record.
+
+        :returns: A dictionary of the fields.
+        """
+        data = dict((f, record[f]) for f in self.fields if f in record)
+        if self.ttl > 0:
+            self.backend.set(str(recid), dict(
+                expires=time.time() + self.ttl, data=data), ttl=self.ttl)
+        return dict(data)
+
+    def delete(self, recid):
+        """Remove a record from the cache."""
+        self.backend.delete(str(recid))
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Full-text search over the titles and descriptions of secret links.
+
+On PostgreSQL, links are matched with a GIN index on a ``tsvector`` of the
+title and description, which the database keeps up to date. On SQLite, links
+are indexed in an FTS5 table which only holds links which are not revoked.
+It is kept in sync by mapper events of secret links, so that any change made
+through the ORM (e.g. in the admin interface) is indexed, and by a receiver
+of the ``links-revoked`` signal for bulk revocations. Other databases fall
+back to ``LIKE`` queries.
+"""
+
+from __future__ import absolute_import, print_function
+
+import re
+
+from invenio_db import db
+from sqlalchemy import DDL, and_, false, func, inspect, literal, \
+    literal_column, or_, select, table
+from sqlalchemy.sql import column
+
+FTS_TABLE = 'accessrequests_link_fts'
+"""Name of the SQLite FTS5 table."""
+
+link_table = table('accessrequests_link', column('id'), column('title'),
+                   column('description'), column('revoked_at'))
+
+fts_table = table(FTS_TABLE, column('rowid'), column('title'),
+                  column('description'))
+
+create_fts_table = DDL(
+    "CREATE VIRTUAL TABLE IF NOT EXISTS {0} "
+    "USING fts5(title, description)".format(FTS_TABLE)
+).execute_if(dialect='sqlite')
+
+drop_fts_table = DDL(
+    "DROP TABLE IF EXISTS {0}".format(FTS_TABLE)
+).execute_if(dialect='sqlite')
+
+create_gin_index = DDL(
+    "CREATE INDEX ix_accessrequests_link_fts ON accessrequests_link "
+    "USING gin (to_tsvector('simple', title || ' ' || description))"
+).execute_if(dialect='postgresql')
+
+_pg_vector = literal_column(
+    "to_tsvector('simple', accessrequests_link.title || ' ' || "
+    "accessrequests_link.description)"
+)
+"""Document vector matching the expression of the GIN index."""
+
+_word_re = re.compile(r'\w+', re.UNICODE)
+
+
+def parse_terms(q):
+    """Get the search terms of a query string."""
+    return _word_re.findall(q or u'')
+
+
+def match_links(q):
+    """Get a selectable of the ids and ranks of links matching a query.
+
+    Links match if their title or description contains a word starting with
+    each of the terms of the query. A higher rank is a better match.
+
+    :param q: Query string.
+    :returns: Selectable with columns ``id`` and ``rank``.
+    """
+    terms = parse_terms(q)
+    dialect = db.engine.dialect.name
+    if not terms:
+        return select([link_table.c.id, literal(0).label('rank')]).where(
+            false())
+    elif dialect == 'postgresql':
+        tsquery = func.to_tsquery(
+            literal_column("'simple'"),
+            u' & '.join(u'{0}:*'.format(t) for t in terms))
+        return select([
+            link_table.c.id,
+            func.ts_rank(_pg_vector, tsquery).label('rank'),
+        ]).where(_pg_vector.op('@@')(tsquery))
+    elif dialect == 'sqlite':
+        fts = literal_column(FTS_TABLE)
+        return select([
+            fts_table.c.rowid.label('id'),
+            (-func.bm25(fts)).label('rank'),
+        ]).where(fts.op('MATCH')(
+            u' '.join(u'"{0}"*'.format(t) for t in terms)))
+    return select([link_table.c.id, literal(0).label('rank')]).where(and_(*[
+        or_(link_table.c.title.like(u'%{0}%'.format(t)),
+            link_table.c.description.like(u'%{0}%'.format(t)))
+        for t in terms
+    ]))
+
+
+def index_link(connection, link):
+    """Update a link in the search index.
+
+    Revoked links are removed from the index.
+    """
+    if connection.dialect.name == 'sqlite':
+        connection.execute(fts_table.delete().where(
+            fts_table.c.rowid == link.id))
+        if link.revoked_at is None:
+            connection.execute(fts_table.insert().values(
+                rowid=link.id, title=link.title,
+                description=link.description))
+
+
+def unindex_links(connection, link_ids):
+    """Remove links from the search index."""
+    if connection.dialect.name == 'sqlite' and link_ids:
+        connection.execute(fts_table.delete().where(
+            fts_table.c.rowid.in_(link_ids)))
+
+
+def link_inserted(mapper, connection, link):
+    """Mapper hook adding new links to the search index."""
+    index_link(connection, link)
+
+
+def link_updated(mapper, connection, link):
+    """Mapper hook updating the search index when a link is changed."""
+    attrs = inspect(link).attrs
+    if any(attrs[key].history.has_changes()
+           for key in ('title', 'description', 'revoked_at')):
+        index_link(connection, link)
+
+
+def link_deleted(mapper, connection, link):
+    """Mapper hook removing deleted links from the search index."""
+    unindex_links(connection, [link.id])
+
+
+def reindex_links():
+    """Rebuild the search index from the links which are not revoked."""
+    if db.engine.dialect.name == 'sqlite':
+        db.session.execute(fts_table.delete())
+        db.session.execute(fts_table.insert().from_select(
+            ['rowid', 'title', 'description'],
+            select([link_table.c.id, link_table.c.title,
+                    link_table.c.description]).where(
+                link_table.c.revoked_at.is_(None))
+        ))
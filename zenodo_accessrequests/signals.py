@@ -39,3 +39,5 @@ request_confirmed = _signals.signal('request-confirmed')
 link_created = _signals.signal('link-created')
 
 link_revoked = _signals.signal('link-revoked')
+
+links_revoked = _signals.signal('links-revoked')
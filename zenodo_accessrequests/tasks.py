@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+
+"""Background tasks for access requests."""
+
+from __future__ import absolute_import, print_function
+
+from celery import shared_task
+from flask import current_app
+from invenio_db import db
+
+from .models import SecretLink
+
+
+@shared_task(ignore_result=True)
+def sweep_expired_links():
+    """Revoke expired secret links in batches.
+
+    Each batch is committed on its own, so the work is resumed by the next
+    run if interrupted. After ``ACCESSREQUESTS_SWEEP_MAX_BATCHES`` batches
+    the task schedules itself again after
+    ``ACCESSREQUESTS_SWEEP_COUNTDOWN`` seconds, to limit the load on the
+    database.
+    """
+    batch_size = current_app.config['ACCESSREQUESTS_SWEEP_BATCH_SIZE']
+    for i in range(current_app.config['ACCESSREQUESTS_SWEEP_MAX_BATCHES']):
+        link_ids = SecretLink.revoke_expired(batch_size=batch_size)
+        db.session.commit()
+        if len(link_ids) < batch_size:
+            return
+    sweep_expired_links.apply_async(
+        countdown=current_app.config['ACCESSREQUESTS_SWEEP_COUNTDOWN'])
@@ -25,7 +25,7 @@ Also note that the record owner is not allowed to charge you for granting access
 
 Record:
 {{ record["title"] }}
-{{ url_for('invenio_records_ui.recid', pid_value=pid.pid_value, _external=True) }}
+{{ url_for('invenio_records_ui.recid', pid_value=request.recid, _external=True) }}
 
 Full name:
 {{request.sender_full_name}}
@@ -26,7 +26,7 @@ You've got a new access request. To accept/reject the request, please open the l
 
 Record:
 {{ record["title"] }}
-{{ url_for('invenio_records_ui.recid', pid_value=pid.pid_value, _external=True) }}
+{{ url_for('invenio_records_ui.recid', pid_value=request.recid, _external=True) }}
 
 Full name:
 {{request.sender_full_name}}
@@ -26,6 +26,6 @@ Message from owner:
 
 Record:
 {{ record["title"] }}
-{{ url_for('invenio_records_ui.recid', pid_value=pid.pid_value, _external=True) }}
+{{ url_for('invenio_records_ui.recid', pid_value=request.recid, _external=True) }}
 
 The decision to reject the request is solely under the responsibility of the record owner. Hence, please note that {{config.THEME_SITENAME}} staff are not involved in this decision.
@@ -22,7 +22,7 @@
 You have submitted an access request for the following record:
 
 {{ record["title"] }}
-{{ url_for('invenio_records_ui.recid', pid_value=pid.pid_value, _external=True) }}
+{{ url_for('invenio_records_ui.recid', pid_value=request.recid, _external=True) }}
 
 To complete the access request, please verify your email address by clicking the link below:
 
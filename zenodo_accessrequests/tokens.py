@@ -25,20 +25,144 @@
 from __future__ import absolute_import, print_function
 
 import binascii
+import calendar
+import hashlib
+import hmac
+import json
+import numbers
 import os
-from base64 import urlsafe_b64encode
+import threading
 from datetime import datetime
 
 from flask import current_app
-from itsdangerous import BadData, JSONWebSignatureSerializer, \
-    SignatureExpired, TimedJSONWebSignatureSerializer
+from itsdangerous import BadData, BadHeader, BadPayload, BadSignature, \
+    JSONWebSignatureSerializer, SignatureExpired, \
+    TimedJSONWebSignatureSerializer, base64_decode, base64_encode, \
+    want_bytes
 
 SUPPORTED_DIGEST_ALGORITHMS = ('HS256', 'HS512')
 
 
+def current_key_id():
+    """Get id of the key used for signing new tokens.
+
+    ``None`` means that tokens are signed with ``SECRET_KEY`` and do not
+    carry a key id.
+    """
+    return current_app.config['ACCESSREQUESTS_SECRET_KEY_ID']
+
+
+def get_secret_key(key_id=None):
+    """Get the secret key for a key id.
+
+    :param key_id: Id of a key in ``ACCESSREQUESTS_SECRET_KEYS`` or ``None``
+        for ``SECRET_KEY``.
+    :raises KeyError: If the key id is unknown.
+    """
+    if key_id is None:
+        return current_app.config['SECRET_KEY']
+    return current_app.config['ACCESSREQUESTS_SECRET_KEYS'][key_id]
+
+
+class SerializerRegistry(object):
+    """Thread-safe registry of token serializers used for validation.
+
+    Serializers are built once per serializer class (and thus salt), digest
+    algorithm and secret key, and reused afterwards. All serializers are
+    dropped as soon as a change of ``SECRET_KEY`` is detected.
+    """
+
+    def __init__(self):
+        """Initialize registry."""
+        self._lock = threading.Lock()
+        self._serializers = {}
+        self._secret_key = None
+
+    def get(self, serializer_class, algorithm_name, key_id=None):
+        """Get serializer instance for a given class, algorithm and key.
+
+        :raises KeyError: If the key id is unknown.
+        """
+        config_key = current_app.config['SECRET_KEY']
+        key = (serializer_class, algorithm_name, key_id,
+               get_secret_key(key_id))
+        serializer = self._serializers.get(key)
+        if serializer is None:
+            with self._lock:
+                if config_key != self._secret_key:
+                    self._serializers.clear()
+                    self._secret_key = config_key
+                serializer = self._serializers.get(key)
+                if serializer is None:
+                    kwargs = dict(key_id=key_id)
+                    if algorithm_name is not None:
+                        kwargs['algorithm_name'] = algorithm_name
+                    serializer = serializer_class(**kwargs)
+                    self._serializers[key] = serializer
+        return serializer
+
+    def clear(self):
+        """Remove all serializers from the registry."""
+        with self._lock:
+            self._serializers.clear()
+            self._secret_key = None
+
+
+def get_serializer(serializer_class, algorithm_name, key_id=None):
+    """Get a serializer from the registry of the current application.
+
+    Falls back to building a new serializer if the extension has not been
+    initialized on the application.
+    """
+    state = current_app.extensions.get('zenodo-accessrequests')
+    registry = state.serializers if state else SerializerRegistry()
+    return registry.get(serializer_class, algorithm_name, key_id=key_id)
+
+
+def token_digest(token):
+    """Compute a keyed digest of a token.
+
+    The digest can be stored and indexed in place of the token, as the token
+    cannot be recovered from it.
+    """
+    key = hmac.new(want_bytes(current_app.config['SECRET_KEY']),
+                   b'accessrequests-token-digest', hashlib.sha256).digest()
+    return hmac.new(key, want_bytes(token), hashlib.sha256).hexdigest()
+
+
+def load_header(token):
+    """Load the header of a token without verifying its signature.
+
+    :param token: Token in the JWS compact serialization.
+    :returns: The header as a dictionary.
+    :raises itsdangerous.BadHeader: If the header cannot be decoded, does
+        not use one of the ``SUPPORTED_DIGEST_ALGORITHMS`` or refers to an
+        unknown key id.
+    """
+    try:
+        header = json.loads(
+            base64_decode(want_bytes(token).split(b'.', 1)[0]).decode('utf-8')
+        )
+    except Exception as e:
+        raise BadHeader('Could not load token header', original_error=e)
+
+    if not isinstance(header, dict) or \
+            header.get('alg') not in SUPPORTED_DIGEST_ALGORITHMS:
+        raise BadHeader('Unsupported token header', header=header)
+    if header.get('kid') is not None:
+        try:
+            get_secret_key(header['kid'])
+        except (KeyError, TypeError):
+            raise BadHeader('Unknown key id', header=header)
+    return header
+
+
 class TokenMixin(object):
     """Mix-in class for token serializers."""
 
+    key_id = None
+    """Id of the signing key, included in the header of created tokens."""
+
     def create_token(self, obj_id, extra_data):
         """Create a token referencing the object id with extra data.
 
@@ -49,7 +173,8 @@ class TokenMixin(object):
                 id=obj_id,
                 data=extra_data,
                 rnd=binascii.hexlify(os.urandom(4)).decode('utf-8')
-            )
+            ),
+            header_fields=dict(kid=self.key_id) if self.key_id else None
         )
 
     def validate_token(self, token, expected_data=None):
@@ -65,14 +190,26 @@ class TokenMixin(object):
             data = self.load_token(token)
 
             # Compare expected data with data in token.
-            if expected_data:
-                for k in expected_data:
-                    if expected_data[k] != data["data"].get(k):
-                        return None
+            if not self.match_data(data, expected_data):
+                return None
             return data
         except BadData:
             return None
 
+    @staticmethod
+    def match_data(data, expected_data=None):
+        """Check that loaded token data contains the expected data.
+
+        :param data: Token data as returned by ``load_token``.
+        :param expected_data: A dictionary of key/values that must be present
+            in the data part of the token.
+        """
+        if expected_data:
+            for k in expected_data:
+                if expected_data[k] != data["data"].get(k):
+                    return False
+        return True
+
     def load_token(self, token, force=False):
         """Load data in a token.
 
@@ -98,14 +235,8 @@ class EncryptedTokenMixIn(TokenMixin):
     def engine(self):
         """Get cryptographic engine."""
         if not hasattr(self, '_engine'):
-            from cryptography.fernet import Fernet
-            from cryptography.hazmat.backends import default_backend
-            from cryptography.hazmat.primitives import hashes
-
-            digest = hashes.Hash(hashes.SHA256(), backend=default_backend())
-            digest.update(current_app.config['SECRET_KEY'].encode('utf8'))
-            fernet_key = urlsafe_b64encode(digest.finalize())
-            self._engine = Fernet(fernet_key)
+            from .crypto import get_fernet
+            self._engine = get_fernet(current_app.config['SECRET_KEY'])
         return self._engine
 
     def create_token(self, obj_id, extra_data):
@@ -135,37 +266,43 @@ class EmailConfirmationSerializer(TimedJSONWebSignatureSerializer, TokenMixin):
     together with a random bit to ensure all tokens are unique.
     """
 
-    def __init__(self, expires_in=None, **kwargs):
+    def __init__(self, expires_in=None, key_id=None, **kwargs):
         """Initialize underlying TimedJSONWebSignatureSerializer."""
         dt = expires_in or \
             current_app.config['ACCESSREQUESTS_CONFIRMLINK_EXPIRES_IN']
 
+        self.key_id = key_id
         super(EmailConfirmationSerializer, self).__init__(
-            current_app.config['SECRET_KEY'],
+            get_secret_key(key_id),
             expires_in=dt,
             salt='accessrequests-email',
             **kwargs
         )
 
     @classmethod
-    def compat_validate_token(cls, *args, **kwargs):
-        """Multiple algorithm-compatible token validation."""
-        data = None
-        for algorithm in SUPPORTED_DIGEST_ALGORITHMS:
-            data = cls(algorithm_name=algorithm).validate_token(
-                *args, **kwargs)
-            if not data:  # move to next algorithm
-                continue
-        return data
+    def compat_validate_token(cls, token, expected_data=None):
+        """Multiple algorithm-compatible token validation.
+
+        The digest algorithm is read from the token header, so the token is
+        only verified once.
+        """
+        try:
+            header = load_header(token)
+        except BadData:
+            return None
+        return get_serializer(
+            cls, header['alg'], key_id=header.get('kid')
+        ).validate_token(token, expected_data=expected_data)
 
 
 class SecretLinkSerializer(JSONWebSignatureSerializer, TokenMixin):
     """Serializer for secret links."""
 
-    def __init__(self, **kwargs):
+    def __init__(self, key_id=None, **kwargs):
         """Initialize underlying JSONWebSignatureSerializer."""
+        self.key_id = key_id
         super(SecretLinkSerializer, self).__init__(
-            current_app.config['SECRET_KEY'],
+            get_secret_key(key_id),
             salt='accessrequests-link',
             **kwargs
         )
@@ -175,63 +312,240 @@ class TimedSecretLinkSerializer(TimedJSONWebSignatureSerializer,
                                 TokenMixin):
     """Serializer for expiring secret links."""
 
-    def __init__(self, expires_at=None, **kwargs):
+    def __init__(self, expires_at=None, key_id=None, **kwargs):
         """Initialize underlying TimedJSONWebSignatureSerializer."""
         assert isinstance(expires_at, datetime) or expires_at is None
 
         dt = expires_at - datetime.now() if expires_at else None
 
+        self.key_id = key_id
         super(TimedSecretLinkSerializer, self).__init__(
-            current_app.config['SECRET_KEY'],
+            get_secret_key(key_id),
             expires_in=int(dt.total_seconds()) if dt else None,
             salt='accessrequests-timedlink',
             **kwargs
         )
 
 
+def _encode_varint(value):
+    """Encode a non-negative integer as an unsigned LEB128 varint."""
+    result = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            result.append(byte | 0x80)
+        else:
+            result.append(byte)
+            return result
+
+
+def _decode_varint(data, pos):
+    """Decode an unsigned LEB128 varint.
+
+    :returns: Tuple of the decoded value and the position after it.
+    """
+    value = shift = 0
+    while True:
+        if pos >= len(data) or shift > 63:
+            raise BadPayload('Invalid varint')
+        byte = data[pos]
+        pos += 1
+        value |= (byte & 0x7f) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, pos
+
+
+class CompactSecretLinkSerializer(TokenMixin):
+    """Serializer for compact secret link tokens (version 2).
+
+    Instead of JSON in a JSON Web Signature, tokens use a fixed binary layout
+    encoded with URL-safe base64::
+
+        version | flags | [key id] | link id | recid | [expires] | random | MAC
+
+    The key id is stored as a length byte followed by the ASCII id and is
+    only present if flagged. Integers are unsigned varints, ``expires`` is a
+    POSIX timestamp only present if flagged, and the MAC is a truncated
+    HMAC-SHA256 over the preceding bytes. Only tokens having a record id as
+    sole extra data can be serialized.
+    """
+
+    VERSION = 2
+    FLAG_EXPIRES = 0x01
+    FLAG_KEY_ID = 0x02
+    RANDOM_SIZE = 4
+    MAC_SIZE = 16
+
+    def __init__(self, expires_at=None, key_id=None):
+        """Initialize serializer."""
+        assert isinstance(expires_at, datetime) or expires_at is None
+
+        self.expires_at = expires_at
+        self.key_id = key_id
+        self.key = hmac.new(
+            want_bytes(get_secret_key(key_id)),
+            b'accessrequests-link-v2', hashlib.sha256
+        ).digest()
+
+    @classmethod
+    def load_key_id(cls, token):
+        """Load the key id of a token without verifying it.
+
+        :returns: The key id or ``None`` if the token has none.
+        :raises itsdangerous.BadHeader: If the token cannot be decoded or
+            refers to an unknown key id.
+        """
+        try:
+            value = bytearray(base64_decode(token))
+        except Exception as e:
+            raise BadHeader('Could not base64 decode token',
+                            original_error=e)
+        if len(value) < 3 or not value[1] & cls.FLAG_KEY_ID:
+            return None
+        try:
+            key_id = bytes(value[3:3 + value[2]]).decode('ascii')
+            get_secret_key(key_id)
+        except (KeyError, UnicodeDecodeError):
+            raise BadHeader('Unknown key id')
+        return key_id
+
+    @classmethod
+    def supports(cls, extra_data):
+        """Determine if extra data can be stored in a compact token."""
+        recid = extra_data.get('recid') if extra_data else None
+        return list(extra_data or {}) == ['recid'] and \
+            isinstance(recid, numbers.Integral) and \
+            not isinstance(recid, bool) and recid >= 0
+
+    def sign(self, value):
+        """Compute MAC of a value."""
+        return hmac.new(self.key, bytes(value), hashlib.sha256).digest()[
+            :self.MAC_SIZE]
+
+    def dumps(self, obj, header_fields=None):
+        """Serialize token payload.
+
+        ``header_fields`` is accepted for compatibility with the JWS
+        serializers and ignored, as the key id is taken from the serializer.
+        """
+        flags = self.FLAG_EXPIRES if self.expires_at else 0
+        if self.key_id:
+            flags |= self.FLAG_KEY_ID
+        value = bytearray([self.VERSION, flags])
+        if self.key_id:
+            key_id = self.key_id.encode('ascii')
+            value += bytearray([len(key_id)]) + bytearray(key_id)
+        value += _encode_varint(obj['id'])
+        value += _encode_varint(obj['data']['recid'])
+        if self.expires_at:
+            value += _encode_varint(
+                calendar.timegm(self.expires_at.utctimetuple()))
+        value += bytearray(binascii.unhexlify(obj['rnd']))
+        return base64_encode(bytes(value + self.sign(value)))
+
+    def loads(self, token):
+        """Load token payload and verify MAC and expiration time."""
+        try:
+            value = bytearray(base64_decode(token))
+        except Exception as e:
+            raise BadPayload('Could not base64 decode token',
+                             original_error=e)
+
+        if len(value) < 2 + self.RANDOM_SIZE + self.MAC_SIZE:
+            raise BadPayload('Token is too short')
+        if value[0] != self.VERSION:
+            raise BadHeader('Unsupported token version')
+
+        value, mac = value[:-self.MAC_SIZE], value[-self.MAC_SIZE:]
+        if not hmac.compare_digest(bytes(mac), self.sign(value)):
+            raise BadSignature('Signature does not match')
+
+        flags, pos = value[1], 2
+        if flags & self.FLAG_KEY_ID:
+            pos += 1 + value[pos]
+        link_id, pos = _decode_varint(value, pos)
+        recid, pos = _decode_varint(value, pos)
+        expires = None
+        if flags & self.FLAG_EXPIRES:
+            expires, pos = _decode_varint(value, pos)
+        if len(value) - pos != self.RANDOM_SIZE:
+            raise BadPayload('Invalid token length')
+
+        payload = dict(
+            id=link_id,
+            data=dict(recid=recid),
+            rnd=binascii.hexlify(bytes(value[pos:])).decode('utf-8'),
+        )
+        if expires is not None and expires < calendar.timegm(
+                datetime.utcnow().utctimetuple()):
+            raise SignatureExpired('Signature expired', payload=payload)
+        return payload
+
+
 class SecretLinkFactory(object):
     """Functions for creating and validating any secret link tokens."""
 
     @classmethod
     def create_token(cls, obj_id, data, expires_at=None):
-        """Create the secret link token."""
-        if expires_at:
-            s = TimedSecretLinkSerializer(expires_at=expires_at)
+        """Create the secret link token.
+
+        Compact tokens are created if ``ACCESSREQUESTS_SECRET_LINK_VERSION``
+        is set to ``2`` and the data consists of an integer record id only.
+        """
+        if current_app.config['ACCESSREQUESTS_SECRET_LINK_VERSION'] == \
+                CompactSecretLinkSerializer.VERSION and \
+                CompactSecretLinkSerializer.supports(data):
+            s = CompactSecretLinkSerializer(
+                expires_at=expires_at, key_id=current_key_id())
+        elif expires_at:
+            s = TimedSecretLinkSerializer(
+                expires_at=expires_at, key_id=current_key_id())
         else:
-            s = SecretLinkSerializer()
+            s = SecretLinkSerializer(key_id=current_key_id())
 
         return s.create_token(obj_id, data)
 
+    @classmethod
+    def get_serializer(cls, token):
+        """Get the serializer which is able to load a token.
+
+        Tokens without a JWS header are compact tokens. For other tokens the
+        serializer is selected from the digest algorithm and the presence of
+        an expiration time in the token header. The key is looked up from
+        the key id in the token, if any.
+
+        :raises itsdangerous.BadHeader: If the token header is not supported.
+        """
+        if b'.' not in want_bytes(token):
+            return get_serializer(
+                CompactSecretLinkSerializer, None,
+                key_id=CompactSecretLinkSerializer.load_key_id(token))
+
+        header = load_header(token)
+        if 'exp' in header:
+            serializer_class = TimedSecretLinkSerializer
+        else:
+            serializer_class = SecretLinkSerializer
+        return get_serializer(
+            serializer_class, header['alg'], key_id=header.get('kid'))
+
     @classmethod
     def validate_token(cls, token, expected_data=None):
         """Validate a secret link token (non-expiring + expiring)."""
-        for algorithm in SUPPORTED_DIGEST_ALGORITHMS:
-            s = SecretLinkSerializer(algorithm_name=algorithm)
-            st = TimedSecretLinkSerializer(algorithm_name=algorithm)
-
-            try:
-                for serializer in (s, st):
-                    data = serializer.validate_token(
-                        token, expected_data=expected_data)
-                    if data:
-                        return data
-            except SignatureExpired:  # move to next algorithm
-                raise
-            except BadData:
-                continue  # move to next serializer/algorithm
+        try:
+            serializer = cls.get_serializer(token)
+        except BadData:
+            return None
+        return serializer.validate_token(token, expected_data=expected_data)
 
     @classmethod
     def load_token(cls, token, force=False):
-        """Validate a secret link token (non-expiring + expiring)."""
-        for algorithm in SUPPORTED_DIGEST_ALGORITHMS:
-            s = SecretLinkSerializer(algorithm_name=algorithm)
-            st = TimedSecretLinkSerializer(algorithm_name=algorithm)
-            for serializer in (s, st):
-                try:
-                    data = serializer.load_token(token, force=force)
-                    if data:
-                        return data
-                except SignatureExpired:
-                    raise  # signature was parsed and is expired
-                except BadData:
-                    continue  # move to next serializer/algorithm
+        """Load a secret link token (non-expiring + expiring)."""
+        try:
+            return cls.get_serializer(token).load_token(token, force=force)
+        except SignatureExpired:
+            raise  # signature was parsed and is expired
+        except BadData:
+            return None
@@ -28,14 +28,316 @@ from __future__ import absolute_import, print_function
 
 from functools import partial
 
+from flask import current_app, g
+from invenio_accounts.models import User
+from invenio_db import db
+from invenio_pidstore.errors import PersistentIdentifierError
+from invenio_pidstore.models import PersistentIdentifier, PIDStatus
 from invenio_pidstore.resolver import Resolver
 from invenio_records.api import Record
+from invenio_records.models import RecordMetadata
+from sqlalchemy import type_coerce
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm.exc import NoResultFound
+
+from .proxies import current_zenodo_accessrequests
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # pragma: no cover
+    from collections import Mapping
 
 resolver = Resolver(pid_type='recid', object_type='rec',
                     getter=partial(Record.get_record, with_deleted=True))
 """Get a record resolver."""
 
 
+def _query_fields(query, fields):
+    """Add record fields to a query.
+
+    On PostgreSQL only the fields are fetched, with JSON operators. Other
+    databases fetch the JSON documents and the fields are picked in Python.
+
+    :returns: Iterator of the original columns of each row and a dictionary
+        of the fields.
+    """
+    n = len(query.column_descriptions)
+    if db.session.get_bind().dialect.name == 'postgresql':
+        json = type_coerce(RecordMetadata.json, JSONB)
+        query = query.add_columns(*[json[f] for f in fields])
+        for row in query:
+            yield row[:n], dict(
+                (f, v) for f, v in zip(fields, row[n:]) if v is not None)
+    else:
+        for row in query.add_columns(RecordMetadata.json):
+            json = row[n] or {}
+            yield row[:n], dict((f, json[f]) for f in fields if f in json)
+
+
+class RecordFields(Mapping):
+    """Read-only mapping of the fields of a record needed by access requests.
+
+    Only the fields in ``ACCESSREQUESTS_RECORD_FIELDS`` are loaded. The class
+    is meant to be the ``record_class`` of the access request endpoints in
+    ``RECORDS_UI_ENDPOINTS`` (see ``examples/app.py``).
+    """
+
+    def __init__(self, data, id_=None):
+        """Initialize mapping.
+
+        :param data: Dictionary of the record fields.
+        :param id_: Record UUID.
+        """
+        self._data = data
+        self.id = id_
+
+    def __getitem__(self, key):
+        """Get a field."""
+        return self._data[key]
+
+    def __iter__(self):
+        """Iterate over the names of the fields."""
+        return iter(self._data)
+
+    def __len__(self):
+        """Get the number of fields."""
+        return len(self._data)
+
+    def __repr__(self):
+        """Represent the fields."""
+        return 'RecordFields({0!r})'.format(self._data)
+
+    @classmethod
+    def get_record(cls, id_, with_deleted=False):
+        """Get the fields of a record by its UUID.
+
+        Unless deleted records are requested, the fields are read from and
+        stored in the record cache, keyed by the UUID of the record.
+
+        :raises sqlalchemy.orm.exc.NoResultFound: If the record does not
+            exist.
+        """
+        cache = current_zenodo_accessrequests.record_cache
+        data = None if with_deleted else cache.get(_uuid_key(id_))
+        if data is not None:
+            return cls(data, id_=id_)
+
+        query = db.session.query(RecordMetadata.id).filter(
+            RecordMetadata.id == id_)
+        if not with_deleted:
+            query = query.filter(RecordMetadata.json.isnot(None))
+        fields = current_app.config['ACCESSREQUESTS_RECORD_FIELDS']
+        for (id_, ), data in _query_fields(query, fields):
+            if not with_deleted:
+                cache.set(_uuid_key(id_), data)
+            return cls(data, id_=id_)
+        raise NoResultFound()
+
+
+def _uuid_key(id_):
+    """Get the record cache key of a record UUID."""
+    return 'uuid:{0}'.format(id_)
+
+
 def get_record(recid):
-    """Get record."""
-    return resolver.resolve(str(recid))
+    """Get record.
+
+    Records are memoized in the application context (on ``flask.g``), so
+    that each record id is resolved at most once per request. Errors for
+    missing or deleted records are memoized as well and raised again.
+    """
+    return _memoized(
+        '_accessrequests_records', recid, lambda: resolver.resolve(str(recid)))
+
+
+def _memoized(name, recid, resolve):
+    """Resolve a record id using a memo of the application context.
+
+    :param name: Name of the memo on ``flask.g``.
+    :param resolve: Function called if the record id is not memoized, or
+        memoized as ``None``.
+    """
+    memo = g.setdefault(name, {})
+    recid = str(recid)
+    result = memo.get(recid)
+    if result is None:
+        try:
+            result = resolve()
+        except (PersistentIdentifierError, NoResultFound) as e:
+            result = e
+        memo[recid] = result
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def get_records(recids):
+    """Get several records.
+
+    Persistent identifiers and records are fetched with one query each.
+    Records which are not registered (e.g. deleted or redirected) are
+    resolved one by one like in :func:`get_record`. Like there, records are
+    memoized in the application context. Pages which only need a few fields
+    should use :func:`get_records_metadata` instead.
+
+    :param recids: List of record ids.
+    :returns: Dictionary mapping the record ids to ``(pid, record)`` tuples.
+        Missing and deleted records are left out.
+    """
+    records = g.setdefault('_accessrequests_records', {})
+    missing = set(str(recid) for recid in recids) - set(records)
+    if missing:
+        pids = PersistentIdentifier.query.filter(
+            PersistentIdentifier.pid_type == resolver.pid_type,
+            PersistentIdentifier.pid_value.in_(missing),
+            PersistentIdentifier.object_type == resolver.object_type,
+            PersistentIdentifier.status == PIDStatus.REGISTERED,
+        ).all()
+        if pids:
+            objs = dict((r.id, r) for r in Record.get_records(
+                [pid.object_uuid for pid in pids], with_deleted=True))
+            for pid in pids:
+                if pid.object_uuid in objs:
+                    records[pid.pid_value] = (pid, objs[pid.object_uuid])
+
+    result = {}
+    for recid in recids:
+        try:
+            result[recid] = get_record(recid)
+        except (PersistentIdentifierError, NoResultFound):
+            pass
+    return result
+
+
+def invalidate_record(record):
+    """Remove a record from the record cache and the request memos.
+
+    :returns: List of the cache keys of the record, i.e. its record ids and
+        its UUID key.
+    """
+    recids = [pid.pid_value for pid in PersistentIdentifier.query.filter_by(
+        pid_type=resolver.pid_type,
+        object_type=resolver.object_type,
+        object_uuid=record.id,
+    )]
+    records = g.get('_accessrequests_records', {})
+    fields = g.get('_accessrequests_record_fields', {})
+    for recid in recids:
+        records.pop(recid, None)
+        fields.pop(recid, None)
+        current_zenodo_accessrequests.record_cache.delete(recid)
+    current_zenodo_accessrequests.record_cache.delete(_uuid_key(record.id))
+    return recids + [_uuid_key(record.id)]
+
+
+def get_record_fields(recids):
+    """Get the fields of several registered records.
+
+    Persistent identifiers and record fields are fetched with one query.
+
+    :param recids: List of record ids.
+    :returns: Dictionary mapping the record ids (as strings) to
+        :class:`RecordFields`. Missing, deleted and redirected records are
+        left out.
+    """
+    recids = set(str(recid) for recid in recids)
+    if not recids:
+        return {}
+    query = db.session.query(
+        PersistentIdentifier.pid_value, RecordMetadata.id
+    ).join(
+        RecordMetadata, RecordMetadata.id == PersistentIdentifier.object_uuid
+    ).filter(
+        PersistentIdentifier.pid_type == resolver.pid_type,
+        PersistentIdentifier.pid_value.in_(recids),
+        PersistentIdentifier.object_type == resolver.object_type,
+        PersistentIdentifier.status == PIDStatus.REGISTERED,
+        RecordMetadata.json.isnot(None),
+    )
+    fields = current_app.config['ACCESSREQUESTS_RECORD_FIELDS']
+    return dict(
+        (pid_value, RecordFields(data, id_=id_))
+        for (pid_value, id_), data in _query_fields(query, fields)
+    )
+
+
+def get_record_metadata(recid):
+    """Get the fields of a record needed by access requests.
+
+    The fields (see ``ACCESSREQUESTS_RECORD_FIELDS``) are fetched like in
+    :func:`get_records_metadata`. Missing, deleted and redirected records
+    raise the persistent identifier errors of the record resolver, which
+    are memoized like the fields.
+
+    :returns: Dictionary of the record fields.
+    """
+    data = get_records_metadata([recid]).get(recid)
+    if data is None:
+        data = dict(_memoized(
+            '_accessrequests_record_fields', recid,
+            lambda: current_zenodo_accessrequests.record_cache.set(
+                recid, resolver.resolve(str(recid))[1])))
+    return data
+
+
+def get_records_metadata(recids):
+    """Get the fields of several records needed by access requests.
+
+    Fields are memoized in the application context (on ``flask.g``), so
+    that each record is looked up at most once per request, even if the
+    record cache is disabled. Records which are neither memoized nor cached
+    are fetched with :func:`get_record_fields`.
+
+    :returns: Dictionary mapping the record ids to dictionaries of the
+        record fields. Missing and deleted records are left out.
+    """
+    memo = g.setdefault('_accessrequests_record_fields', {})
+    cache = current_zenodo_accessrequests.record_cache
+    result, missing = {}, []
+    for recid in recids:
+        if str(recid) in memo:
+            data = memo[str(recid)]
+            if isinstance(data, dict):
+                result[recid] = dict(data)
+            continue
+        data = cache.get(recid)
+        if data is None:
+            missing.append(recid)
+        else:
+            memo[str(recid)], result[recid] = data, dict(data)
+    records = get_record_fields(missing) if missing else {}
+    for recid in missing:
+        record = records.get(str(recid))
+        # Records which are not registered are memoized as None, so that
+        # get_record_metadata resolves them for their errors.
+        data = None if record is None else cache.set(recid, record)
+        memo[str(recid)] = data
+        if data is not None:
+            result[recid] = dict(data)
+    return result
+
+
+def get_record_owners(owner_ids):
+    """Get the users owning a record.
+
+    The users and their profiles (if the ``profile`` relationship of
+    Invenio-UserProfiles exists) are fetched with one query.
+
+    :param owner_ids: List of user ids, e.g. the ``owners`` of a record.
+    :returns: List of the users in the order of ``owner_ids``. Ids of
+        deleted accounts are skipped.
+    """
+    owner_ids = [int(i) for i in owner_ids]
+    if not owner_ids:
+        return []
+    query = User.query.filter(User.id.in_(set(owner_ids)))
+    if hasattr(User, 'profile'):
+        query = query.options(db.joinedload(User.profile))
+    users = dict((u.id, u) for u in query)
+
+    owners, seen = [], set()
+    for i in owner_ids:
+        if i in users and i not in seen:
+            owners.append(users[i])
+            seen.add(i)
+    return owners
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+# This file is part of Zenodo.
+# Copyright (C) 2026 CERN.
+#
+# Zenodo is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# Zenodo is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with Zenodo. If not, see <http://www.gnu.org/licenses/>.
+#
+# In applying this licence, CERN does not waive the privileges and immunities
+# granted to it by virtue of its status as an Intergovernmental Organization
+# or submit itself to any jurisdiction.
+
+"""REST API for checking secret link tokens from other services."""
+
+from __future__ import absolute_import, print_function
+
+from datetime import datetime
+
+from flask import Blueprint, abort, current_app, jsonify, request
+from flask_login import current_user
+from invenio_db import db
+from six import integer_types, string_types, text_type
+
+from ..models import SecretLink
+from ..permissions import introspect_tokens_permission_factory
+from ..tokens import SecretLinkFactory
+
+blueprint = Blueprint(
+    'zenodo_accessrequests_api',
+    __name__,
+    url_prefix='/accessrequests',
+)
+
+
+@blueprint.route('/tokens/introspect', methods=['POST'])
+def introspect():
+    """Check a batch of secret link tokens.
+
+    Expects a JSON list of objects with a ``token`` and a ``recid``, and
+    returns a list with the result for each of them in the same order::
+
+        [{"valid": true, "link_id": 1, "expires_at": "2017-01-01T00:00:00"}]
+
+    All links are loaded with a single query. The response may be cached
+    until the earliest expiration date of the valid links, but for no longer
+    than ``ACCESSREQUESTS_INTROSPECT_MAX_AGE`` seconds.
+
+    Only available to users (e.g. other services authenticated with an API
+    token) allowed the ``accessrequests-introspect-tokens`` action.
+    """
+    if not introspect_tokens_permission_factory().can():
+        abort(403 if current_user.is_authenticated else 401)
+
+    items = request.get_json(silent=True)
+    if not isinstance(items, list) or \
+            len(items) > current_app.config[
+                'ACCESSREQUESTS_INTROSPECT_MAX_TOKENS']:
+        abort(400)
+
+    payloads = []
+    for item in items:
+        if not isinstance(item, dict) or not item.get('token') or \
+                not isinstance(item['token'], string_types) or \
+                not isinstance(item.get('recid'),
+                               string_types + integer_types) or \
+                isinstance(item['recid'], bool):
+            abort(400)
+        data = SecretLinkFactory.validate_token(item['token'])
+        # Record ids are compared as strings, as both tokens and clients may
+        # hold them as numbers or strings.
+        if data and text_type(data['data'].get('recid')) != \
+                text_type(item['recid']):
+            data = None
+        payloads.append(data)
+
+    links = {}
+    link_ids = set(data['id'] for data in payloads if data)
+    if link_ids:
+        links = dict(
+            (link.id, link) for link in db.session.query(
+                SecretLink.id, SecretLink.revoked_at, SecretLink.expires_at
+            ).filter(SecretLink.id.in_(link_ids))
+        )
+
+    now = datetime.utcnow()
+    max_age = current_app.config['ACCESSREQUESTS_INTROSPECT_MAX_AGE']
+    results = []
+    for data in payloads:
+        link = links.get(data['id']) if data else None
+        if link is None:
+            results.append(dict(valid=False, link_id=None, expires_at=None))
+            continue
+
+        valid = link.revoked_at is None and \
+            (link.expires_at is None or link.expires_at > now)
+        if valid and link.expires_at:
+            max_age = min(
+                max_age, int((link.expires_at - now).total_seconds()))
+        results.append(dict(
+            valid=valid,
+            link_id=link.id,
+            expires_at=link.expires_at.isoformat() if link.expires_at
+            else None,
+        ))
+
+    response = jsonify(results)
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    return response
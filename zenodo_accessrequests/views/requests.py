@@ -26,16 +26,16 @@ from __future__ import absolute_import, print_function
 
 from datetime import datetime
 
-from flask import Blueprint, abort, current_app, flash, redirect, \
-    render_template, request, url_for
+from flask import Blueprint, abort, flash, redirect, render_template, \
+    request, url_for
 from flask_babelex import gettext as _
 from flask_login import current_user
 from invenio_db import db
-from werkzeug.local import LocalProxy
 
 from ..forms import AccessRequestForm
 from ..models import AccessRequest, RequestStatus
 from ..tokens import EmailConfirmationSerializer
+from ..utils import get_record_owners
 
 blueprint = Blueprint(
     'zenodo_accessrequests',
@@ -80,8 +80,6 @@ def is_removed(record):
 def access_request(pid, record, template, **kwargs):
     """Create an access request."""
     recid = int(pid.pid_value)
-    datastore = LocalProxy(
-        lambda: current_app.extensions['security'].datastore)
 
     # Record must be in restricted access mode.
     if record.get('access_right') != 'restricted' or \
@@ -89,8 +87,7 @@ def access_request(pid, record, template, **kwargs):
         abort(404)
 
     # Record must have an owner and owner must still exists.
-    owners = record.get('owners', [])
-    record_owners = [datastore.find_user(id=owner_id) for owner_id in owners]
+    record_owners = get_record_owners(record.get('owners', []))
     if not record_owners:
         abort(404)
 
@@ -149,8 +146,8 @@ def confirm(pid, record, template, **kwargs):
         flash(_("Invalid confirmation link."), category='danger')
         return redirect(url_for("invenio_records_ui.recid", pid_value=recid))
 
-    # Validate request exists.
-    r = AccessRequest.query.get(data['id'])
+    # Validate request exists (receiver is needed for the notifications).
+    r = AccessRequest.get_by_id(data['id'], load=('receiver', ))
     if not r:
         abort(404)
 
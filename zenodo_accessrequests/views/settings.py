@@ -26,8 +26,8 @@ from __future__ import absolute_import, print_function
 
 import re
 
-from flask import Blueprint, abort, flash, redirect, render_template, \
-    request, url_for
+from flask import Blueprint, abort, current_app, flash, jsonify, redirect, \
+    render_template, request, url_for
 from flask_babelex import gettext as _
 from flask_breadcrumbs import register_breadcrumb
 from flask_login import current_user, login_required
@@ -35,10 +35,11 @@ from flask_menu import register_menu
 from invenio_db import db
 from jinja2 import Markup, escape, evalcontextfilter
 
-from ..forms import ApprovalForm, DeleteForm
+from ..forms import ApprovalForm, DeleteForm, RevokeLinksForm
 from ..helpers import QueryOrdering
-from ..models import AccessRequest, RequestStatus, SecretLink
-from ..utils import get_record
+from ..models import AccessRequest, PendingRequestCount, RequestStatus, \
+    SecretLink
+from ..utils import get_record_metadata, get_records_metadata
 
 blueprint = Blueprint(
     'zenodo_accessrequests_settings',
@@ -63,6 +64,14 @@ def nl2br(eval_ctx, value):
     return result
 
 
+@blueprint.app_template_global()
+def pending_access_requests():
+    """Get the number of pending access requests of the current user."""
+    if current_user.is_authenticated:
+        return PendingRequestCount.get(current_user.id)
+    return 0
+
+
 @blueprint.route("/", methods=['GET', 'POST'])
 @login_required
 @register_menu(
@@ -79,52 +88,77 @@ def index():
     """List pending access requests and shared links."""
     query = request.args.get('query', '')
     order = request.args.get('sort', '-created')
+    cursor = request.args.get('cursor')
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 20))
+        per_page = int(request.args.get(
+            'per_page', current_app.config['ACCESSREQUESTS_LINKS_PER_PAGE']))
     except (TypeError, ValueError):
         abort(404)
+    per_page = min(max(per_page, 1),
+                   current_app.config['ACCESSREQUESTS_LINKS_MAX_PER_PAGE'])
 
     # Delete form
     form = DeleteForm(request.form)
-    if form.validate_on_submit():
+    if form.delete.data and form.validate_on_submit():
         link = SecretLink.query_by_owner(current_user).filter_by(
             id=form.link.data).first()
-        if link.revoke():
+        if link and link.revoke():
             flash(_("Shared link revoked."), category='success')
         db.session.commit()
 
-    # Links
-    links = SecretLink.query_by_owner(current_user).filter(
-        SecretLink.revoked_at.is_(None)
-    )
+    # Revoke selected links form
+    revoke_form = RevokeLinksForm(request.form)
+    if revoke_form.revoke.data and revoke_form.validate_on_submit():
+        link_ids = SecretLink.revoke_many(
+            owner=current_user, ids=revoke_form.links.data)
+        if link_ids:
+            flash(_("%(num)d shared links revoked.", num=len(link_ids)),
+                  category='success')
+        db.session.commit()
 
-    # Querying
+    # Links
     if query:
-        lquery = "%{0}%".format(query)
-        links = links.filter(
-            SecretLink.title.like(lquery) | SecretLink.description.like(lquery)
-        )
+        links = SecretLink.search(current_user, query, ranked=False)
+    else:
+        links = SecretLink.query_by_owner(current_user).filter(
+            SecretLink.revoked_at.is_(None))
 
     # Ordering
     ordering = QueryOrdering(links, ['title', 'created', 'expires_at'], order)
-    links = ordering.items()
+    try:
+        links_pagination = ordering.paginate(per_page, cursor=cursor)
+    except ValueError:
+        abort(404)
+    # Only the tokens of the listed links are decrypted for their URLs.
+    SecretLink.load_tokens(links_pagination.items)
 
     # Pending access requests
     requests = AccessRequest.query_by_receiver(current_user).filter_by(
-        status=RequestStatus.PENDING).order_by('created')
+        status=RequestStatus.PENDING).order_by('created').all()
 
     return render_template(
         "zenodo_accessrequests/settings/index.html",
-        links_pagination=links.paginate(page, per_page=per_page),
+        links_pagination=links_pagination,
         requests=requests,
+        pending_num=PendingRequestCount.get(current_user.id),
         query=query,
         order=ordering,
-        get_record=get_record,
+        records=get_records_metadata([r.recid for r in requests]),
         form=DeleteForm(),
+        revoke_form=RevokeLinksForm(),
     )
 
 
+@blueprint.route("/pending/")
+@login_required
+def pending():
+    """Get the number of pending access requests as JSON."""
+    response = jsonify(pending=PendingRequestCount.get(current_user.id))
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
 @blueprint.route("/accessrequest/<int:request_id>/", methods=['GET', 'POST'])
 @login_required
 @register_breadcrumb(
@@ -162,7 +196,7 @@ def accessrequest(request_id):
             flash(_("Request rejected."))
             return redirect(url_for(".index"))
 
-    pid, record = get_record(r.recid)
+    record = get_record_metadata(r.recid)
     return render_template(
         "zenodo_accessrequests/settings/request.html",
         accessrequest=r,